@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.user'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # query cache invalidation must run in every process that writes, not only in web workers
+        import utils.cache.query_cache  # noqa: F401
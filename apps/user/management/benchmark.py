@@ -0,0 +1,68 @@
+"""
+Helpers shared by the `bench_*` management commands.
+"""
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def measure(func, iterations: int) -> list:
+    """
+    Call `func` once to warm up (connections, script and plan caches), then
+    `iterations` times, and return the timings in milliseconds.
+    """
+    func()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def write_timings(stdout, results):
+    """
+    Write mean / p50 / p99 per path. Results are `(label, timings)` pairs, or
+    `(label, timings, rows)` to add a rows per second column.
+    """
+    with_rows = any(len(result) > 2 for result in results)
+    header = f"{'path':<12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    stdout.write(header + (f"{'rows/s':>12}" if with_rows else ""))
+
+    for label, timings, *rows in results:
+        timings = sorted(timings)
+        mean = statistics.mean(timings)
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        line = f"{label:<12}{mean:>10.3f}{statistics.median(timings):>10.3f}{p99:>10.3f}"
+        if with_rows:
+            rate = rows[0] / (mean / 1000) if rows and mean else 0
+            line += f"{rate:>12.0f}"
+        stdout.write(line)
+
+
+def user_rows(page_size: int) -> list:
+    """
+    A page of user-list rows as a serializer would return them.
+    """
+    now = timezone.now()
+    return [
+        {
+            "id": index,
+            "uuid": uuid.uuid4(),
+            "username": f"user{index}",
+            "first_name": "Benchmark",
+            "last_name": f"User {index}",
+            "email": f"user{index}@example.com",
+            "is_active": True,
+            "is_staff": index % 10 == 0,
+            "balance": Decimal("1250.50"),
+            "role": _("Member"),
+            "date_joined": now - timedelta(days=index),
+            "last_login": now,
+        }
+        for index in range(page_size)
+    ]
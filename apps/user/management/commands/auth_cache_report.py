@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.auth import codec
+from core.auth.sessions import session_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the Redis memory used by auth records (token:*, user:*, sessions:*) "
+        "and the resulting bytes per live session."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of keys fetched per SCAN call and measured per pipeline.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Stop after this many keys per record type (0 scans everything).",
+        )
+
+    def handle(self, *args, **options):
+        client = session_store.get_client()
+        totals = {}
+        for label, pattern in (
+            ("session", "token:*"),
+            ("user", "user:*"),
+            ("index", "sessions:*"),
+        ):
+            totals[label] = self.measure(client, cache.make_key(pattern), options)
+
+        self.stdout.write(f"{'record':<10}{'keys':>10}{'bytes':>14}{'avg bytes':>12}{'codec':>10}{'legacy':>10}")
+        for label, (keys, size, encoded) in totals.items():
+            average = size / keys if keys else 0
+            self.stdout.write(
+                f"{label:<10}{keys:>10}{size:>14}{average:>12.1f}{encoded:>10}{keys - encoded:>10}"
+            )
+
+        sessions = totals["session"][0]
+        if sessions:
+            per_session = sum(size for _, size, _ in totals.values()) / sessions
+            self.stdout.write(self.style.SUCCESS(f"{per_session:.1f} bytes per session"))
+        else:
+            self.stdout.write("No sessions found.")
+
+    def measure(self, client, pattern, options):
+        batch_size = options["batch_size"]
+        limit = options["limit"]
+
+        keys = size = encoded = 0
+        batch = []
+        for key in client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                keys, size, encoded = self.measure_batch(client, batch, keys, size, encoded)
+                batch = []
+            if limit and keys + len(batch) >= limit:
+                break
+        if batch:
+            keys, size, encoded = self.measure_batch(client, batch, keys, size, encoded)
+        return keys, size, encoded
+
+    def measure_batch(self, client, batch, keys, size, encoded):
+        pipe = client.pipeline(transaction=False)
+        for key in batch:
+            pipe.memory_usage(key)
+            pipe.type(key)
+        results = pipe.execute()
+
+        # only string records carry a codec header, the index sets are skipped
+        pipe = client.pipeline(transaction=False)
+        strings = []
+        for key, key_type in zip(batch, results[1::2]):
+            if key_type in (b"string", "string"):
+                pipe.getrange(key, 0, codec.HEADER.size - 1)
+                strings.append(key)
+        headers = pipe.execute() if strings else []
+
+        keys += len(batch)
+        size += sum(usage or 0 for usage in results[0::2])
+        encoded += sum(1 for header in headers if codec.is_encoded(header))
+        return keys, size, encoded
@@ -0,0 +1,48 @@
+import json
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.user.management.benchmark import measure, user_rows, write_timings
+from utils.api.fastjson import LazyEncoder
+from utils.api.renderers import EnvelopeJSONRenderer, build_envelope
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cost of producing the API envelope for a paginated user list: "
+        "render then re-encode in the middleware against rendering the envelope once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        page_size = options["page_size"]
+        payload = {
+            "count": page_size * 10,
+            "next": "http://localhost/api/v1/users/?page=2",
+            "previous": None,
+            "results": user_rows(page_size),
+        }
+        renderer = JSONRenderer()
+        envelope_renderer = EnvelopeJSONRenderer()
+
+        def middleware():
+            # what CustomResponse did with every DRF response before the envelope renderer
+            renderer.render(payload)
+            envelope, _ = build_envelope(payload, 200, "GET")
+            return json.dumps(envelope, cls=LazyEncoder).encode()
+
+        def renderer_once():
+            envelope, _ = build_envelope(payload, 200, "GET")
+            return envelope_renderer.render(envelope)
+
+        results = [
+            ("middleware", measure(middleware, iterations)),
+            ("renderer", measure(renderer_once, iterations)),
+        ]
+
+        self.stdout.write(f"{len(renderer_once())} bytes per response")
+        write_timings(self.stdout, results)
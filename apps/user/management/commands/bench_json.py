@@ -0,0 +1,46 @@
+import json
+from django.core.management.base import BaseCommand
+
+from apps.user.management.benchmark import measure, user_rows, write_timings
+from utils.api import fastjson
+from utils.api.fastjson import LazyEncoder
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure JSON encoding and decoding of a user-list page: stdlib json with "
+        "LazyEncoder against utils.api.fastjson."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        page_size = options["page_size"]
+        payload = {
+            "error": False,
+            "code": 200,
+            "message": None,
+            "data": user_rows(page_size),
+            "count": page_size * 10,
+            "next": "http://localhost/api/v1/users/?page=2",
+            "previous": None,
+        }
+        stdlib_body = json.dumps(payload, cls=LazyEncoder).encode()
+        fast_body = fastjson.dumps(payload)
+
+        if json.loads(stdlib_body) != json.loads(fast_body):
+            self.stderr.write(self.style.ERROR("fastjson output differs from LazyEncoder output"))
+
+        results = [
+            ("json dumps", measure(lambda: json.dumps(payload, cls=LazyEncoder).encode(), iterations)),
+            ("fast dumps", measure(lambda: fastjson.dumps(payload), iterations)),
+            ("json loads", measure(lambda: json.loads(stdlib_body), iterations)),
+            ("fast loads", measure(lambda: fastjson.loads(fast_body), iterations)),
+        ]
+
+        backend = "orjson" if fastjson.orjson is not None else "stdlib fallback"
+        self.stdout.write(f"backend: {backend}, {len(stdlib_body)} / {len(fast_body)} bytes")
+        write_timings(self.stdout, results)
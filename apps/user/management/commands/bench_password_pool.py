@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from core.auth.hashing import PasswordVerifier
+
+
+PASSWORD = "bench-password-1"
+READ_PAYLOAD = {"id": 1, "username": "bench", "email": "bench@example.com", "is_active": True}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login and read throughput under mixed load, with password "
+        "hashing inline and on the core.auth.hashing process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run.")
+        parser.add_argument("--login-threads", type=int, default=8)
+        parser.add_argument("--read-threads", type=int, default=8)
+        parser.add_argument("--workers", type=int, default=2, help="Pool size of the pooled run.")
+
+    def handle(self, *args, **options):
+        user = get_user_model()(username="bench", password=make_password(PASSWORD))
+
+        rows = []
+        for label, workers in (("inline", 0), (f"pool({options['workers']})", options["workers"])):
+            verifier = PasswordVerifier(workers=workers)
+            if verifier.enabled:
+                # warm the pool up so process start-up is not measured
+                verifier.verify(user, PASSWORD)
+            logins, reads = self.run(verifier, user, options)
+            rows.append((label, logins, reads))
+
+        self.stdout.write(f"{'mode':<12}{'logins/s':>12}{'reads/s':>14}")
+        for label, logins, reads in rows:
+            duration = options["duration"]
+            self.stdout.write(f"{label:<12}{logins / duration:>12.1f}{reads / duration:>14.1f}")
+
+    def run(self, verifier, user, options):
+        stop = threading.Event()
+        counts = {"logins": 0, "reads": 0}
+        lock = threading.Lock()
+
+        def login():
+            done = 0
+            while not stop.is_set():
+                verifier.verify(user, PASSWORD)
+                done += 1
+            with lock:
+                counts["logins"] += done
+
+        def read():
+            done = 0
+            while not stop.is_set():
+                json.loads(json.dumps(READ_PAYLOAD))
+                done += 1
+            with lock:
+                counts["reads"] += done
+
+        threads = [threading.Thread(target=login) for _ in range(options["login_threads"])]
+        threads += [threading.Thread(target=read) for _ in range(options["read_threads"])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options["duration"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return counts["logins"], counts["reads"]
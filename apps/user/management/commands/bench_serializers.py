@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.user.management.benchmark import measure, write_timings
+from utils.api import fastjson
+from utils.api.compiled import CompiledListSerializer
+
+User = get_user_model()
+
+
+class UserRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = [
+            "id", "username", "first_name", "last_name", "email",
+            "is_active", "is_staff", "date_joined", "last_login",
+        ]
+
+
+class CompiledUserRowSerializer(UserRowSerializer):
+    class Meta(UserRowSerializer.Meta):
+        list_serializer_class = CompiledListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure list serialization of user rows: the stock DRF ListSerializer "
+        "against utils.api.compiled, in rows per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument(
+            "--database", action="store_true",
+            help="Also serialize a queryset of existing users, the compiled path reading values_list().",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        rows = self.rows(options["page_size"])
+
+        stock = UserRowSerializer(rows, many=True).data
+        compiled = CompiledUserRowSerializer(rows, many=True).data
+        if fastjson.dumps(stock) != fastjson.dumps(compiled):
+            self.stderr.write(self.style.ERROR("compiled output differs from the DRF output"))
+
+        results = [
+            ("stock", measure(lambda: UserRowSerializer(rows, many=True).data, iterations), len(rows)),
+            ("compiled", measure(lambda: CompiledUserRowSerializer(rows, many=True).data, iterations), len(rows)),
+        ]
+
+        if options["database"]:
+            queryset = User.objects.order_by("id")[:options["page_size"]]
+            count = queryset.count()
+            results += [
+                ("stock db", measure(lambda: UserRowSerializer(queryset.all(), many=True).data, iterations), count),
+                (
+                    "values db",
+                    measure(lambda: CompiledUserRowSerializer(queryset.all(), many=True).data, iterations),
+                    count,
+                ),
+            ]
+
+        write_timings(self.stdout, results)
+
+    def rows(self, page_size: int) -> list:
+        now = timezone.now()
+        return [
+            User(
+                id=index,
+                username=f"user{index}",
+                first_name="Benchmark",
+                last_name=f"User {index}",
+                email=f"user{index}@example.com",
+                is_active=True,
+                is_staff=index % 10 == 0,
+                date_joined=now - timedelta(days=index),
+                last_login=now if index % 2 else None,
+            )
+            for index in range(1, page_size + 1)
+        ]
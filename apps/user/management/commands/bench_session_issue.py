@@ -0,0 +1,50 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand
+
+from apps.user.management.benchmark import measure, write_timings
+from core.auth.sessions import session_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the Redis cost of issuing a login session: the previous "
+        "sequence of separate calls against the single SessionStore.issue script."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument(
+            "--user-id",
+            default="bench",
+            help="User id used for the benchmark keys, they are removed afterwards.",
+        )
+        parser.add_argument("--single-login", action="store_true")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        user_id = options["user_id"]
+        single_login = options["single_login"]
+        timeout = 60
+        record = {"token_type": "refresh", "user_id": user_id, "exp": int(time.time()) + timeout}
+        user_record = {"id": 0, "username": "bench", "is_active": True}
+
+        def sequential():
+            jti = uuid.uuid4().hex
+            if single_login:
+                session_store.revoke_all(user_id)
+            session_store.write_user(user_id, user_record, timeout)
+            session_store.add(user_id, jti, record, timeout)
+
+        def scripted():
+            session_store.issue(user_id, uuid.uuid4().hex, record, user_record, timeout, single_login=single_login)
+
+        try:
+            results = [
+                ("sequential", measure(sequential, iterations)),
+                ("issue()", measure(scripted, iterations)),
+            ]
+        finally:
+            session_store.revoke_all(user_id, include_user=True)
+
+        write_timings(self.stdout, results)
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.auth.sessions import session_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Index existing token:{user_id}:{jti} session keys into the per-user "
+        "sessions:{user_id} sets used by core.auth.sessions.SessionStore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of keys fetched per SCAN call and written per pipeline.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be indexed.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        client = session_store.get_client()
+        prefix = cache.make_key("token:")
+
+        sessions = 0
+        users = set()
+        batch = []
+        for raw_key in client.scan_iter(match=f"{prefix}*", count=batch_size):
+            batch.append(raw_key.decode() if isinstance(raw_key, bytes) else raw_key)
+            if len(batch) >= batch_size:
+                sessions += self.index_batch(client, prefix, batch, users, dry_run)
+                batch = []
+        if batch:
+            sessions += self.index_batch(client, prefix, batch, users, dry_run)
+
+        action = "Would index" if dry_run else "Indexed"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {sessions} sessions for {len(users)} users.")
+        )
+
+    def index_batch(self, client, prefix, keys, users, dry_run) -> int:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.pttl(key)
+        ttls = pipe.execute()
+
+        # user_id -> [jtis, longest remaining ttl in ms or None when persistent]
+        indexed = defaultdict(lambda: [[], 0])
+        for key, ttl in zip(keys, ttls):
+            user_id, _, jti = key[len(prefix):].partition(":")
+            if not jti or ttl == -2:
+                # malformed key or already expired
+                continue
+            entry = indexed[user_id]
+            entry[0].append(jti)
+            # ttl == -1 means the session key never expires, keep the index persistent too
+            entry[1] = None if ttl == -1 or entry[1] is None else max(entry[1], ttl)
+
+        users.update(indexed)
+        if dry_run or not indexed:
+            return sum(len(jtis) for jtis, _ in indexed.values())
+
+        index_keys = {user_id: cache.make_key(session_store.index_key(user_id)) for user_id in indexed}
+        pipe = client.pipeline(transaction=False)
+        for user_id, (jtis, _) in indexed.items():
+            # -2: no index yet, -1: an index kept without expiry
+            pipe.pttl(index_keys[user_id])
+            pipe.sadd(index_keys[user_id], *jtis)
+        results = pipe.execute()
+
+        pipe = client.pipeline(transaction=False)
+        for (user_id, (_, ttl)), index_ttl in zip(indexed.items(), results[0::2]):
+            if ttl is None:
+                pipe.persist(index_keys[user_id])
+            elif index_ttl == -2 or 0 <= index_ttl < ttl:
+                # never put an expiry on an index that was created without one
+                pipe.pexpire(index_keys[user_id], ttl)
+        pipe.execute()
+
+        return sum(len(jtis) for jtis, _ in indexed.values())
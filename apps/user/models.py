@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 # Create your models here.
@@ -12,11 +13,21 @@ class User(AbstractUser):
     # Current serializers/views reference fields that don't exist: gender, school, session_login_id, is_deleted
     # Either add these fields or remove references to them in:
     #   - apps/user/serializers.py (gender, school)
-    #   - core/auth/backend.py (school, session_login_id, is_deleted)
+    #   - core/auth/backend.py (school, is_deleted)
     
     # Add any additional fields or methods you need for your custom user model
     # For example, you can add a profile picture field:
     # profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # case-insensitive email login filters on lower(email)
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+# Allows `email__lower=...` lookups, which match the functional index above.
+User._meta.get_field("email").register_lookup(Lower)
@@ -2,11 +2,12 @@ from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Dict
 from django.contrib.auth import authenticate
-from django.core.cache import cache
 from django.db.models import Prefetch
 from rest_framework import exceptions, serializers
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from core.auth.backend import CustomRefreshToken
+from core.auth.sessions import session_store
+from core.auth.token_cache import verified_token_cache
 from .models import (
     User,
 )
@@ -140,8 +141,8 @@ class LogoutSerializerV2(serializers.Serializer):
 
     def create(self, validated_data):
         request = self.context.get("request")
-        cache.delete_pattern(f"token:{request.user.id}:*")
-        cache.delete_pattern(f"user:{request.user.id}*")
+        session_store.revoke_all(request.user.id, include_user=True)
+        verified_token_cache.invalidate_user(request.user.id)
         return validated_data
 
     def to_representation(self, instance):
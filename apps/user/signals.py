@@ -0,0 +1,49 @@
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.auth.backend import login_miss_keys_for
+from core.auth.circuit_breaker import CACHE_ERRORS
+from core.auth.principal import CACHED_FIELDS
+from core.auth.sessions import session_store
+from core.auth.token_cache import verified_token_cache
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=User, dispatch_uid="user_clear_login_miss_cache")
+def clear_login_miss_cache(sender, instance, **kwargs):
+    """
+    Forget negative login lookups once a user with that username or email exists.
+    """
+    cache.delete_many(login_miss_keys_for(instance))
+
+
+def forget_cached_user(user_id):
+    """
+    Drop the `user:{id}` snapshot and this worker's verified tokens of the user,
+    so the next request sees the current row.
+    """
+    verified_token_cache.invalidate_user(user_id)
+    try:
+        session_store.delete_user(user_id)
+    except CACHE_ERRORS:
+        logger.exception("Could not drop the cached snapshot of user %s.", user_id)
+
+
+@receiver(post_save, sender=User, dispatch_uid="user_forget_cached_snapshot")
+def forget_snapshot_on_save(sender, instance, update_fields=None, using=None, **kwargs):
+    # saves that only touch columns outside the snapshot (e.g. a password rehash) keep it
+    if update_fields is not None and not set(update_fields) & set(CACHED_FIELDS):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_cached_user(user_id), using=using)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="user_forget_deleted_snapshot")
+def forget_snapshot_on_delete(sender, instance, using=None, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_cached_user(user_id), using=using)
@@ -1,4 +1,247 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# TODO: Remove this file if no tests are needed, or implement actual tests for the User model and authentication
-# Create your tests here.
+import redis
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.auth import backend
+from core.auth.backend import NewAuthentication, degraded_sessions
+from core.auth.circuit_breaker import CircuitBreaker, CircuitOpen
+from core.auth.revocation import RevocationList
+from utils.api.exceptions import ServiceUnavailable
+
+USER = get_user_model()
+
+
+class FakeSessionStore:
+    """
+    Stand-in for `core.auth.sessions.session_store` that simulates a Redis outage:
+    `down` raises ConnectionError, `delay` answers slower than the breaker allows.
+    """
+
+    def __init__(self, user_record):
+        self.user_record = user_record
+        self.session = True
+        self.down = False
+        self.delay = 0.0
+        self.reads = 0
+
+    def _answer(self, value):
+        self.reads += 1
+        if self.down:
+            raise redis.ConnectionError("Connection refused")
+        if self.delay:
+            time.sleep(self.delay)
+        return value
+
+    def read(self, user_id, jti):
+        return self._answer((self.session, self.user_record))
+
+    def read_user(self, user_id):
+        return self._answer(self.user_record)
+
+
+def failing():
+    raise redis.ConnectionError("Connection refused")
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("test", failure_threshold=2, slow_call=0.05, reset_timeout=0.05)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            with self.assertRaises(redis.ConnectionError):
+                self.breaker.call(failing)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpen):
+            self.breaker.call(lambda: "ok")
+        self.assertEqual(self.breaker.stats()["short_circuits"], 1)
+
+    def test_slow_calls_count_as_failures(self):
+        for _ in range(2):
+            self.assertEqual(self.breaker.call(time.sleep, 0.06), None)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()["slow_calls"], 2)
+
+    def test_success_resets_the_failure_count(self):
+        with self.assertRaises(redis.ConnectionError):
+            self.breaker.call(failing)
+        self.breaker.call(lambda: "ok")
+        with self.assertRaises(redis.ConnectionError):
+            self.breaker.call(failing)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_probe_closes_on_success(self):
+        for _ in range(2):
+            with self.assertRaises(redis.ConnectionError):
+                self.breaker.call(failing)
+        time.sleep(0.06)
+
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_probe_reopens_on_failure(self):
+        for _ in range(2):
+            with self.assertRaises(redis.ConnectionError):
+                self.breaker.call(failing)
+        time.sleep(0.06)
+
+        with self.assertRaises(redis.ConnectionError):
+            self.breaker.call(failing)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        for _ in range(2):
+            with self.assertRaises(redis.ConnectionError):
+                self.breaker.call(failing)
+        time.sleep(0.06)
+
+        def probe():
+            with self.assertRaises(CircuitOpen):
+                self.breaker.call(lambda: "second")
+            return "first"
+
+        self.assertEqual(self.breaker.call(probe), "first")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_other_errors_do_not_count(self):
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.breaker.call(int, "x")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class RevocationListTests(SimpleTestCase):
+    def setUp(self):
+        self.revocations = RevocationList(enabled=True, block_ms=50, read_margin=0.05)
+        patcher = mock.patch.object(self.revocations, "ensure_started")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # as after a catch-up
+        self.revocations._synced = True
+        self.revocations._last_read = time.monotonic()
+
+    def test_answers_locally_while_reads_keep_coming(self):
+        self.revocations.add(["revoked"])
+        self.assertIs(self.revocations.is_revoked("revoked"), True)
+        self.assertIs(self.revocations.is_revoked("other"), False)
+
+    def test_stalled_stream_falls_back_to_redis(self):
+        time.sleep(0.11)
+        self.assertIsNone(self.revocations.is_revoked("other"))
+
+    def test_lost_stream_falls_back_to_redis(self):
+        with self.assertLogs("core.auth.revocation", "ERROR"):
+            try:
+                raise redis.TimeoutError("Timeout reading from socket")
+            except redis.TimeoutError:
+                self.revocations._lost()
+        self.assertIsNone(self.revocations.is_revoked("other"))
+
+
+# the session store is faked, signal handlers only need some cache
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class AuthCacheOutageTests(TestCase):
+    """
+    `NewAuthentication.get_user_new` while the session cache is down or slow.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER.objects.create_user(username="outage", email="outage@example.com", password="secret")
+
+    def setUp(self):
+        degraded_sessions.clear()
+        self.store = FakeSessionStore({
+            "id": self.user.pk,
+            "username": self.user.username,
+            "email": self.user.email,
+            "is_active": True,
+            "is_staff": False,
+            "is_superuser": False,
+        })
+        self.breaker = CircuitBreaker("auth-cache-test", failure_threshold=2, slow_call=0.05, reset_timeout=0.05)
+        for target, value in (
+            ("session_store", self.store),
+            ("auth_cache_breaker", self.breaker),
+        ):
+            patcher = mock.patch.object(backend, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(backend.revocation_list, "is_revoked", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.auth = NewAuthentication()
+
+    def token(self, jti="known"):
+        return {"user_id": self.user.pk, "jti": jti}
+
+    def test_healthy_cache_resolves_the_user_without_the_database(self):
+        with self.assertNumQueries(0):
+            user = self.auth.get_user_new(self.token())
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(degraded_sessions.get((self.user.pk, "known")), True)
+
+    def test_known_session_is_served_from_the_database_while_the_cache_is_down(self):
+        self.auth.get_user_new(self.token())
+        self.store.down = True
+
+        for _ in range(3):
+            user = self.auth.get_user_new(self.token())
+            self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        # the third request was short-circuited without touching the cache
+        self.assertEqual(self.store.reads, 3)
+
+    def test_unknown_session_gets_503_while_the_cache_is_down(self):
+        self.store.down = True
+        with self.assertRaises(ServiceUnavailable):
+            self.auth.get_user_new(self.token("unseen"))
+
+    def test_slow_cache_opens_the_circuit(self):
+        self.auth.get_user_new(self.token())
+        self.store.delay = 0.06
+
+        for _ in range(2):
+            self.auth.get_user_new(self.token())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(ServiceUnavailable):
+            self.auth.get_user_new(self.token("unseen"))
+
+    def test_circuit_closes_once_the_cache_recovers(self):
+        self.auth.get_user_new(self.token())
+        self.store.down = True
+        for _ in range(2):
+            self.auth.get_user_new(self.token())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.store.down = False
+        time.sleep(0.06)
+        user = self.auth.get_user_new(self.token("unseen"))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_inactive_user_is_rejected_in_degraded_mode(self):
+        self.auth.get_user_new(self.token())
+        USER.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.store.down = True
+
+        with self.assertRaises(backend.AuthenticationFailed):
+            self.auth.get_user_new(self.token())
+
+    def test_session_missing_from_redis_is_rejected_when_not_locally_revoked(self):
+        # e.g. evicted by Redis, so a logout may never have reached the revocation stream
+        self.store.session = None
+        with mock.patch.object(backend.revocation_list, "is_revoked", return_value=False):
+            with self.assertRaises(backend.AuthenticationFailed):
+                self.auth.get_user_new(self.token())
+
+    def test_locally_revoked_session_is_rejected_without_redis(self):
+        with mock.patch.object(backend.revocation_list, "is_revoked", return_value=True):
+            with self.assertRaises(backend.AuthenticationFailed):
+                self.auth.get_user_new(self.token())
+        self.assertEqual(self.store.reads, 0)
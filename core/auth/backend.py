@@ -1,10 +1,10 @@
 import uuid
+import hashlib
 import json
 import contextlib
 from django.core.cache import cache
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from django.utils import timezone
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
@@ -19,37 +19,65 @@ from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.serializers import ModelSerializer
 
+from utils.api.exceptions import ServiceUnavailable
+from utils.cache.lru import LRUCache
+
+from .circuit_breaker import CACHE_ERRORS, CircuitOpen, auth_cache_breaker
+from .hashing import password_verifier
+from .last_login import last_login_buffer
+from .loader import UserLoader
+from .principal import CachedPrincipal
+from .revocation import revocation_list
+from .sessions import session_store
+from .token_cache import verified_token_cache
+
 
 USER = get_user_model()
 DEFAULT_CACHE = cache
 
+# Sessions this worker recently confirmed against Redis, trusted while the auth cache circuit is open.
+degraded_sessions = LRUCache(
+    maxsize=getattr(settings, "AUTH_DEGRADED_SESSIONS_MAXSIZE", 10000),
+    ttl=getattr(settings, "AUTH_DEGRADED_SESSIONS_TTL", 300.0),
+)
+
 class CacheUserSlimSerializer(ModelSerializer):
     """
     CacheUserSlimSerializer is a serializer for the USER model that provides
     serialization and deserialization of user data, including caching functionality.
-    Attributes:
-        json (property): Returns the serialized data in JSON format with indentation.
+    The cached snapshot itself is stored in the binary format of `core.auth.codec`.
     Methods:
         from_cache(cls, data):
-            Class method that deserializes the given JSON string `data` and retrieves
-            the corresponding user instance from the database. If the user is not found
-            or multiple users are returned, it raises an AuthenticationFailed exception.
+            Class method that turns a decoded snapshot (or a legacy JSON string) `data` into a
+            `CachedPrincipal`, without querying the database. The full user instance is
+            only loaded when a field that is not cached gets accessed. If the record has
+            no user id, it raises an AuthenticationFailed exception.
+        loads(cls, data) / from_dict(cls, data_dict):
+            The two halves of `from_cache`, used by `user_loader` to inspect the
+            snapshot metadata before building the principal.
         Meta:
             model (USER): The model that is being serialized.
             fields (list): List of fields to be included in the serialized output.
     """
 
-    @property
-    def json(self):
-        return json.dumps(self.data, indent=4)
-    
+    @classmethod
+    def loads(cls, data):
+        if isinstance(data, (dict, cls.Meta.model)):
+            return data
+        return json.loads(data)
+
+    @classmethod
+    def from_dict(cls, data_dict):
+        if data_dict.get("id") is None:
+            raise AuthenticationFailed("user_not_found_or_invalid_school_id", code="user_not_found")
+        return CachedPrincipal.from_dict(data_dict)
+
     @classmethod
     def from_cache(cls, data):
-        data_dict = json.loads(data)
-        with contextlib.suppress(ObjectDoesNotExist, MultipleObjectsReturned):
-            instance = cls.Meta.model.objects.get(id=data_dict.get("id"))
-            return instance
-        raise AuthenticationFailed("user_not_found_or_invalid_school_id", code="user_not_found")
+        data = cls.loads(data)
+        if isinstance(data, cls.Meta.model):
+            return data
+        return cls.from_dict(data)
 
     class Meta:
         model = USER
@@ -61,9 +89,12 @@ class CacheUserSlimSerializer(ModelSerializer):
             "email",
             "is_staff",
             "is_active",
+            "is_superuser",
             "date_joined",
         ]
 
+user_loader = UserLoader.from_settings(CacheUserSlimSerializer)
+
 class CustomBlacklistMixins:
     """
     A mixin class that provides custom blacklist functionality for token verification and user authentication.
@@ -71,23 +102,31 @@ class CustomBlacklistMixins:
     --------
     verify(*args, **kwargs):
         Verifies the token by checking if it is blacklisted and then calls the parent class's verify method.
+        The blacklist lookup is skipped when `check_blacklist_on_verify` is False, for callers that
+        check the session themselves.
     check_blacklist():
         Checks if the token is blacklisted by looking it up in the cache. Raises an InvalidToken exception if the token is blacklisted.
     for_user(cls, user):
         Generates a token for the given user, adds custom claims, and stores the token and user information in the cache. 
-        Handles single login by deleting previous tokens for the user. Updates the user's last login time and saves the user.
+        Handles single login by deleting previous tokens for the user. Updates the user's last login time through the
+        write-behind `last_login_buffer` instead of saving the user row.
+        Sessions are registered in the per-user `sessions:{user_id}` index of `session_store`; eviction of
+        previous sessions, the user snapshot and the new session are written in one atomic Redis call.
     blacklist():
-        Blacklists the token by deleting the user and token information from the cache.
+        Blacklists the token by deleting the user and every session of the user from the cache.
     """
+    check_blacklist_on_verify = True
+
     def verify(self, *args, **kwargs):
-        self.check_blacklist()
+        if self.check_blacklist_on_verify:
+            self.check_blacklist()
         super().verify(*args, **kwargs)
 
     def check_blacklist(self):
         jti = self.payload[api_settings.JTI_CLAIM]
         user_id = self.payload["user_id"]
 
-        if not DEFAULT_CACHE.get(f"token:{user_id}:{jti}"):
+        if not session_store.exists(user_id, jti):
             raise InvalidToken(_("Token is blacklisted"))
 
     @classmethod
@@ -100,30 +139,24 @@ class CustomBlacklistMixins:
             token["school_id"] = user.school.id
         
         # TODO: Add IS_SINGLE_LOGIN to settings.base.py or remove this feature
-        if settings.IS_SINGLE_LOGIN:
-            DEFAULT_CACHE.delete_pattern(f"token:{user.id}:*")
-        
-        DEFAULT_CACHE.set(
-            f"user:{user.id}", 
-            CacheUserSlimSerializer(user).json, 
-            int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
-        )
-        DEFAULT_CACHE.set(
-            key=f"token:{user.id}:{token['jti']}",
-            value=token,
+        evicted = session_store.issue(
+            user_id=user.id,
+            jti=token["jti"],
+            record=token,
+            user_record=user_loader.snapshot(user),
             timeout=int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+            single_login=settings.IS_SINGLE_LOGIN,
         )
-        user.last_login = timezone.now()
-        # TODO: Remove session_login_id - User model doesn't have this field in boilerplate
-        user.session_login_id = None
-        user.save()
+        if evicted:
+            verified_token_cache.invalidate_user(user.id)
+        last_login_buffer.record(user)
         return token
 
     def blacklist(self):
-        jti = self.payload[api_settings.JTI_CLAIM]
         user_id = self.payload["user_id"]
-        DEFAULT_CACHE.delete(f"user:{user_id}")
-        return DEFAULT_CACHE.delete_pattern(f"token:{user_id}*")
+        revoked = session_store.revoke_all(user_id, include_user=True)
+        verified_token_cache.invalidate_user(user_id)
+        return len(revoked)
 
 class CustomRefreshToken(CustomBlacklistMixins, Token):
     """
@@ -167,6 +200,13 @@ class CustomRefreshToken(CustomBlacklistMixins, Token):
 class CustomAccessToken(CustomRefreshToken):
     token_type = "access"
 
+class SessionAccessToken(CustomAccessToken):
+    """
+    Access token that leaves the session lookup to `NewAuthentication.get_user_new`,
+    which reads the session record and the cached user in a single Redis round trip.
+    """
+    check_blacklist_on_verify = False
+
 class NewAuthentication:
     """
     A class used to handle user authentication.
@@ -192,6 +232,13 @@ class NewAuthentication:
             If no user is found or multiple users are returned.
 
         Retrieves a user based on the validated token and checks the user's session and activity status.
+        The session record and the cached user are fetched together in one round trip. Sessions found in
+        the replicated `revocation_list` are rejected before that; a session missing from Redis (expired or
+        evicted) is rejected even when the local list does not know about it.
+        Missing or expiring user snapshots are reloaded through `user_loader`, so concurrent misses for the
+        same user cause a single database query.
+        Redis calls go through `auth_cache_breaker`. While it is open, sessions recently confirmed by this
+        worker are still accepted and the user is loaded from the database; any other session gets a 503.
         Parameters
         ----------
         validated_token : dict
@@ -213,25 +260,64 @@ class NewAuthentication:
         raise AuthenticationFailed("user_not_found_or_invalid_school_id", code="user_not_found")
    
     def get_user_new(self, validated_token):
-        if not cache.get(f"token:{validated_token.get('user_id')}:{validated_token.get('jti')}"):
+        user_id, jti = validated_token.get('user_id'), validated_token.get('jti')
+        revoked = revocation_list.is_revoked(jti)
+        if revoked:
+            raise AuthenticationFailed(_("This session is terminated because of new login into different device or browser."), code="session_expired")
+        try:
+            # the session record comes with the user snapshot, an evicted or expired one is not trusted
+            session, user_cache = auth_cache_breaker.call(session_store.read, user_id, jti)
+        except (CircuitOpen, *CACHE_ERRORS):
+            return self.get_user_degraded(user_id, jti, revoked)
+        if not session:
             raise AuthenticationFailed(_("This session is terminated because of new login into different device or browser."), code="session_expired")
+        degraded_sessions.set((user_id, jti), True)
 
-        user_cache = cache.get(f"user:{validated_token.get('user_id')}")
-        if not user_cache:
-            params = {api_settings.USER_ID_FIELD: validated_token.get('user_id')}
-            user = self.user_instance(params)
-        else:
-            user = CacheUserSlimSerializer.from_cache(user_cache)
+        try:
+            user = user_loader.get(user_id, user_cache)
+        except CACHE_ERRORS:
+            auth_cache_breaker.record_failure()
+            user = user_loader.fetch(user_id)
       
         if not user.is_active:
             raise AuthenticationFailed("user_blocked", code="user_inactive")
     
         return user
 
+    def get_user_degraded(self, user_id, jti, revoked=None):
+        """
+        Resolve the user without Redis, only for sessions this worker confirmed recently.
+        """
+        if revoked:
+            raise AuthenticationFailed(_("This session is terminated because of new login into different device or browser."), code="session_expired")
+        if degraded_sessions.get((user_id, jti)) is None:
+            raise ServiceUnavailable()
+
+        user = user_loader.fetch(user_id)
+        if not user.is_active:
+            raise AuthenticationFailed("user_blocked", code="user_inactive")
+        return user
+
 class CustomJWTAuthentication(JWTAuthentication, NewAuthentication):
     def get_user(self, validated_token):
         return self.get_user_new(validated_token)
 
+def login_miss_key(params: dict) -> str:
+    """
+    Cache key of the negative lookup entry for a set of login filter params.
+    """
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return f"login:miss:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+def login_miss_keys_for(user) -> list:
+    """
+    Negative lookup keys that a login for `user` could have produced.
+    """
+    keys = [login_miss_key({"username": user.username})]
+    if user.email:
+        keys.append(login_miss_key({"email__lower": user.email.lower()}))
+    return keys
+
 class AuthenticateNewMixins:
     """
     A mixin class that provides methods for authenticating users and handling errors.
@@ -240,11 +326,14 @@ class AuthenticateNewMixins:
     error_raiser(host, err_msg: str = None):
         Raises appropriate authentication or validation errors based on the host.
     __get_user(host, params):
-        Retrieves a user from the database based on the provided parameters and caches the user.
-        Raises an error if the user is not found or multiple users are returned.
+        Retrieves a user from the database based on the provided parameters. The user snapshot is
+        cached when the session is issued (`CustomBlacklistMixins.for_user`).
+        Raises an error if the user is not found or multiple users are returned. Unknown identifiers
+        are remembered for a short while (`login_miss_key`), so repeated attempts skip the database.
     authenticate_new(request=None, username=None, email=None, password=None, school=None, user_type=None, **kwargs):
         Authenticates a user based on the provided credentials and additional parameters.
         Performs various checks to ensure the user can be authenticated and raises errors if any checks fail.
+        The password hash is checked through `password_verifier`, which can run it on a dedicated process pool.
     """
     def error_raiser(self, host, err_msg: str = None):
         if "api" in host:
@@ -256,14 +345,16 @@ class AuthenticateNewMixins:
             return 
 
     def __get_user(self, host, params):
-        with contextlib.suppress(ObjectDoesNotExist, MultipleObjectsReturned):
-            user = USER.objects.get(**params)
-            cache.set(
-                f"user:{user.id}", 
-                user,
-                int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
-            )
-            return user
+        miss_key = login_miss_key(params)
+        if not cache.get(miss_key):
+            try:
+                user = USER.objects.get(**params)
+            except ObjectDoesNotExist:
+                cache.set(miss_key, 1, getattr(settings, "AUTH_LOGIN_NEGATIVE_CACHE_TTL", 60))
+            except MultipleObjectsReturned:
+                pass
+            else:
+                return user
         err_msg = "invalid_username_password"
         self.error_raiser(host, err_msg)
 
@@ -275,7 +366,8 @@ class AuthenticateNewMixins:
             filter_params["username"] = username
 
         if not filter_params and email:
-            filter_params["email__iexact"] = email
+            # served by the functional index on lower(email), see apps.user.models.User
+            filter_params["email__lower"] = email.lower()
         
         if not filter_params:
             err_msg = _("Email or Username required.")
@@ -283,7 +375,7 @@ class AuthenticateNewMixins:
 
         user = self.__get_user(host, filter_params)
 
-        if not user.check_password(password):
+        if not password_verifier.verify(user, password):
             err_msg = "invalid_username_password"
             self.error_raiser(host, err_msg)
 
@@ -324,6 +416,8 @@ class UserAuthorization(TokenAuthentication, NewAuthentication):
             Checks if the request is a logout request based on the request path.
         authenticate(request):
             Authenticates the user based on the provided token in the request.
+            Tokens that were verified recently are served from the per-worker
+            `verified_token_cache` without re-verifying or touching Redis.
     """
     keyword = "Bearer"
     user_model = get_user_model()
@@ -360,10 +454,13 @@ class UserAuthorization(TokenAuthentication, NewAuthentication):
 
         is_logout_request = self.is_logout(request)
         raw_token = self.get_raw_token(request)
-        token = CustomAccessToken(raw_token)
-        
-        token.check_blacklist()
-        user = self.get_user_new(token)
+        cached = verified_token_cache.get(raw_token)
+        if cached:
+            token, user = cached
+        else:
+            token = SessionAccessToken(raw_token)
+            user = self.get_user_new(token)
+            verified_token_cache.set(raw_token, token, user)
 
         if not user.is_active:
             raise ValidationError(detail="user_blocked")
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+# Errors that mean the cache itself is unhealthy, anything else is raised as is.
+CACHE_ERRORS = (RedisError, ConnectionInterrupted, OSError)
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that keeps failing or answering slowly.
+
+    closed     calls go through; `failure_threshold` consecutive failures or
+               calls slower than `slow_call` seconds open the circuit.
+    open       calls fail fast with CircuitOpen for `reset_timeout` seconds.
+    half_open  a single probe call is let through: success closes the circuit,
+               failure opens it again.
+
+    Every transition is logged and counted; counters are available through `stats()`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call: float = 0.25,
+                 reset_timeout: float = 10.0, errors=CACHE_ERRORS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.errors = errors
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.short_circuits = 0
+        self.opened = 0
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except self.errors:
+            self.record_failure()
+            raise
+        except Exception:
+            self._release_probe()
+            raise
+
+        if time.monotonic() - started > self.slow_call:
+            self.slow_calls += 1
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+    def _before_call(self):
+        with self._lock:
+            self.calls += 1
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.short_circuits += 1
+                    raise CircuitOpen(self.name)
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.short_circuits += 1
+                    raise CircuitOpen(self.name)
+                self._probing = True
+
+    def _release_probe(self):
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        log = logger.warning if state == self.OPEN else logger.info
+        log("Circuit %s: %s -> %s (consecutive failures: %s)", self.name, self.state, state, self._failures)
+        self.state = state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "short_circuits": self.short_circuits,
+            "opened": self.opened,
+        }
+
+
+auth_cache_breaker = CircuitBreaker(
+    "auth-cache",
+    failure_threshold=getattr(settings, "AUTH_CACHE_BREAKER_FAILURES", 5),
+    slow_call=getattr(settings, "AUTH_CACHE_BREAKER_SLOW_CALL", 0.25),
+    reset_timeout=getattr(settings, "AUTH_CACHE_BREAKER_RESET_TIMEOUT", 10.0),
+)
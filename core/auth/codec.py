@@ -0,0 +1,130 @@
+"""
+Versioned binary encoding of the auth records kept in Redis.
+
+Every record starts with a 3 byte header: MAGIC, format version and record kind.
+MAGIC can never be the first byte of a pickle (0x80) or of django-redis' plain
+integer encoding (an ASCII digit or "-"), so records written before this format
+existed are still told apart and read through the cache client's own decoder.
+
+User snapshot, version 1:
+    >qBddd   id, flags (is_staff, is_active, is_superuser), date_joined,
+             snapshot expiry, snapshot build time (floats are unix seconds,
+             NaN for missing values)
+    4 x (>H length + utf-8)   username, first_name, last_name, email
+
+Session record, version 1:
+    >dd      iat, exp of the refresh token
+"""
+import math
+import struct
+from datetime import datetime, timezone
+from django.utils.dateparse import parse_datetime
+
+
+MAGIC = 0xA7
+VERSION = 1
+
+KIND_USER = 1
+KIND_SESSION = 2
+
+HEADER = struct.Struct(">BBB")
+USER_FIXED = struct.Struct(">qBddd")
+SESSION_FIXED = struct.Struct(">dd")
+STRING_LENGTH = struct.Struct(">H")
+
+USER_STRINGS = ("username", "first_name", "last_name", "email")
+USER_FLAGS = ("is_staff", "is_active", "is_superuser")
+
+
+class CodecError(ValueError):
+    pass
+
+
+def is_encoded(value) -> bool:
+    return isinstance(value, (bytes, bytearray)) and len(value) >= HEADER.size and value[0] == MAGIC
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _optional(value):
+    return None if math.isnan(value) else value
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return _float(value)
+
+
+def _header(value, kind):
+    if not is_encoded(value):
+        raise CodecError("Not an encoded auth record.")
+    _, version, record_kind = HEADER.unpack_from(value)
+    if version != VERSION:
+        raise CodecError(f"Unsupported auth record version {version}.")
+    if record_kind != kind:
+        raise CodecError(f"Expected auth record kind {kind}, got {record_kind}.")
+    return HEADER.size
+
+
+def encode_user(data: dict) -> bytes:
+    flags = 0
+    for bit, name in enumerate(USER_FLAGS):
+        if data.get(name):
+            flags |= 1 << bit
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION, KIND_USER),
+        USER_FIXED.pack(
+            int(data["id"]),
+            flags,
+            _timestamp(data.get("date_joined")),
+            _float(data.get("_expires_at")),
+            _float(data.get("_delta")),
+        ),
+    ]
+    for name in USER_STRINGS:
+        raw = (data.get(name) or "").encode()
+        parts.append(STRING_LENGTH.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def decode_user(value) -> dict:
+    offset = _header(value, KIND_USER)
+    user_id, flags, date_joined, expires_at, delta = USER_FIXED.unpack_from(value, offset)
+    offset += USER_FIXED.size
+
+    data = {"id": user_id}
+    for bit, name in enumerate(USER_FLAGS):
+        data[name] = bool(flags & (1 << bit))
+    for name in USER_STRINGS:
+        (length,) = STRING_LENGTH.unpack_from(value, offset)
+        offset += STRING_LENGTH.size
+        data[name] = bytes(value[offset:offset + length]).decode()
+        offset += length
+
+    date_joined = _optional(date_joined)
+    data["date_joined"] = (
+        datetime.fromtimestamp(date_joined, tz=timezone.utc) if date_joined is not None else None
+    )
+    data["_expires_at"] = _optional(expires_at)
+    data["_delta"] = _optional(delta)
+    return data
+
+
+def encode_session(payload: dict) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, KIND_SESSION) + SESSION_FIXED.pack(
+        _float(payload.get("iat")),
+        _float(payload.get("exp")),
+    )
+
+
+def decode_session(value) -> dict:
+    offset = _header(value, KIND_SESSION)
+    iat, exp = SESSION_FIXED.unpack_from(value, offset)
+    return {"iat": _optional(iat), "exp": _optional(exp)}
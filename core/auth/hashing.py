@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import Throttled
+
+from utils.api.exceptions import ServiceUnavailable
+
+
+def _check_password(password, encoded) -> bool:
+    # Runs inside the pool processes, only needs the PASSWORD_HASHERS setting.
+    return check_password(password, encoded)
+
+
+def _must_update(encoded) -> bool:
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher("default")
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class PasswordVerifier:
+    """
+    Verifies login passwords on a dedicated process pool.
+
+    Password hashing (PBKDF2 by default) is deliberately expensive. Running it on
+    the request thread lets a burst of logins take all the CPU of the web workers
+    that also serve cheap reads. With `workers` > 0 the hash is computed on a
+    separate `ProcessPoolExecutor` instead, so at most `workers` hashes run at a
+    time and the remaining logins queue there while reads keep their latency.
+
+    `max_queue` bounds the number of logins waiting for a pool slot; past it new
+    logins are rejected with 429 instead of piling up. `stats()` exposes the
+    current queue depth.
+
+    A check that does not finish within `timeout` is answered with 429. A pool
+    whose processes died is replaced, and the login that hit it gets a 503.
+
+    With `workers` set to 0 passwords are checked inline, as before.
+    """
+
+    def __init__(self, workers: int = 0, max_queue: int = 0, timeout: float = 10.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            workers=getattr(settings, "AUTH_PASSWORD_POOL_SIZE", 0),
+            max_queue=getattr(settings, "AUTH_PASSWORD_POOL_MAX_QUEUE", 0),
+            timeout=getattr(settings, "AUTH_PASSWORD_POOL_TIMEOUT", 10.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    def get_executor(self):
+        # A pool created before a fork is unusable in the child, create one per process.
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pid = pid
+        return self._executor
+
+    def reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, password, encoded):
+        with self._lock:
+            if self.max_queue and self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise Throttled(detail=_("Too many login attempts in progress, please try again."))
+            self.in_flight += 1
+            self.submitted += 1
+
+        executor = self.get_executor()
+        try:
+            future = executor.submit(_check_password, password, encoded)
+        except BrokenProcessPool:
+            with self._lock:
+                self.in_flight -= 1
+            self.reset_executor(executor)
+            raise ServiceUnavailable()
+        future.executor = executor
+        future.add_done_callback(self._done)
+        return future
+
+    def failed(self, future, exc):
+        """
+        Map a pool failure of `future` to the API error of the login.
+        """
+        if isinstance(exc, BrokenProcessPool):
+            self.reset_executor(future.executor)
+            return ServiceUnavailable()
+        future.cancel()
+        return Throttled(detail=_("Too many login attempts in progress, please try again."))
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def verify(self, user, password) -> bool:
+        if not self.enabled:
+            return user.check_password(password)
+
+        encoded = user.password
+        future = self.submit(password, encoded)
+        try:
+            valid = future.result(timeout=self.timeout)
+        except (FutureTimeout, BrokenProcessPool) as exc:
+            raise self.failed(future, exc) from exc
+        return self._finish(user, password, encoded, valid)
+
+    async def averify(self, user, password) -> bool:
+        if not self.enabled:
+            return await sync_to_async(user.check_password)(password)
+
+        encoded = user.password
+        future = self.submit(password, encoded)
+        try:
+            valid = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except (asyncio.TimeoutError, FutureTimeout, BrokenProcessPool) as exc:
+            raise self.failed(future, exc) from exc
+        return await sync_to_async(self._finish)(user, password, encoded, valid)
+
+    def _finish(self, user, password, encoded, valid) -> bool:
+        # Same hash upgrade AbstractBaseUser.check_password does through its setter.
+        if valid and _must_update(encoded):
+            user.set_password(password)
+            user._password = None
+            user.save(update_fields=["password"])
+        return valid
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_verifier = PasswordVerifier.from_settings()
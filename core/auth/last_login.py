@@ -0,0 +1,106 @@
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from utils.threads import ProcessThread
+
+logger = logging.getLogger(__name__)
+
+USER = get_user_model()
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for `last_login` timestamps.
+
+    Logins only record the timestamp in process memory; a background thread
+    writes everything buffered with a single
+    `bulk_update(update_fields=["last_login"])` every `flush_interval` seconds,
+    or as soon as `max_pending` users are waiting. The buffer is also flushed at
+    interpreter exit, so a graceful worker shutdown does not lose timestamps.
+
+    With `flush_interval` set to 0 the timestamp is written immediately with a
+    single-column UPDATE instead.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, max_pending: int = 1000, batch_size: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = ProcessThread("last-login-flusher", self._run, on_start=self._register_atexit)
+        self._atexit_registered = False
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            flush_interval=getattr(settings, "AUTH_LAST_LOGIN_FLUSH_INTERVAL", 10.0),
+            max_pending=getattr(settings, "AUTH_LAST_LOGIN_MAX_PENDING", 1000),
+        )
+
+    def record(self, user, when=None):
+        when = when or timezone.now()
+        user.last_login = when
+
+        if self.flush_interval <= 0:
+            USER.objects.filter(pk=user.pk).update(last_login=when)
+            return
+
+        with self._lock:
+            current = self._pending.get(user.pk)
+            if current is None or current < when:
+                self._pending[user.pk] = when
+            pending = len(self._pending)
+
+        self.ensure_started()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            USER.objects.bulk_update(
+                [USER(pk=pk, last_login=when) for pk, when in pending.items()],
+                ["last_login"],
+                batch_size=self.batch_size,
+            )
+        except Exception:
+            logger.exception("Failed to flush %s last_login updates, retrying later.", len(pending))
+            with self._lock:
+                for pk, when in pending.items():
+                    current = self._pending.get(pk)
+                    if current is None or current < when:
+                        self._pending[pk] = when
+            return 0
+        return len(pending)
+
+    def ensure_started(self):
+        self._flusher.ensure_started()
+
+    def _register_atexit(self):
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # the thread keeps its own connection, don't leave it open between flushes
+                connection.close()
+
+
+last_login_buffer = LastLoginBuffer.from_settings()
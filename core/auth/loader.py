@@ -0,0 +1,193 @@
+import contextlib
+import math
+import random
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .sessions import session_store
+
+
+USER = get_user_model()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class UserLoader:
+    """
+    Reloads `user:{id}` snapshots with stampede protection.
+
+    On a cache miss only one request per user goes to the database:
+        - concurrent requests in the same worker wait on the in-flight load
+          and share its result, and
+        - across workers a short `lock:user:{id}` key elects a single loader;
+          the others poll the cache for the fresh snapshot and only fall back
+          to the database once `wait_timeout` has passed.
+
+    Snapshots carry their expiry and the time it took to build them, which is
+    used for probabilistic early expiration (XFetch): as a hot key gets close to
+    expiry a single request refreshes it ahead of time while everyone else keeps
+    being served the current snapshot.
+
+    Counters for loads, coalesced waits, lock waits and early refreshes are
+    available through `stats()`.
+    """
+
+    def __init__(self, serializer_class, lock_timeout: int = 5, wait_timeout: float = 2.0,
+                 poll_interval: float = 0.05, beta: float = 1.0, backend=None):
+        self.serializer_class = serializer_class
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.beta = beta
+        self.cache = backend or cache
+        self.sessions = session_store
+        self.timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+        self.early_refreshes = 0
+        self.stale_served = 0
+
+    @classmethod
+    def from_settings(cls, serializer_class):
+        return cls(
+            serializer_class,
+            lock_timeout=getattr(settings, "AUTH_USER_LOAD_LOCK_TIMEOUT", 5),
+            wait_timeout=getattr(settings, "AUTH_USER_LOAD_WAIT_TIMEOUT", 2.0),
+            beta=getattr(settings, "AUTH_USER_EARLY_REFRESH_BETA", 1.0),
+        )
+
+    @staticmethod
+    def lock_key(user_id) -> str:
+        return f"lock:user:{user_id}"
+
+    def get(self, user_id, record=None):
+        """
+        Resolve the user from a cached `record`, reloading it when missing or
+        when it was picked for early refresh.
+        """
+        stale = None
+        if record is not None:
+            data = self.serializer_class.loads(record)
+            if not isinstance(data, dict):
+                return data
+            if not self.should_refresh(data):
+                return self.serializer_class.from_dict(data)
+            self.early_refreshes += 1
+            stale = data
+        return self.load(user_id, stale=stale)
+
+    def should_refresh(self, data: dict) -> bool:
+        expires_at = data.get("_expires_at")
+        if not expires_at or self.beta <= 0:
+            return False
+        delta = data.get("_delta") or 0.01
+        return time.time() - delta * self.beta * math.log(1.0 - random.random()) >= expires_at
+
+    def load(self, user_id, stale: dict = None):
+        key = str(user_id)
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            self.coalesced += 1
+            if stale is not None:
+                self.stale_served += 1
+                return self.serializer_class.from_dict(stale)
+            if call.event.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return self.serializer_class.from_dict(call.result)
+            return self.fetch(user_id)
+
+        try:
+            user, data = self._load_shared(user_id, stale)
+            call.result = data
+            return user
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            call.event.set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _load_shared(self, user_id, stale: dict = None):
+        lock_key = self.lock_key(user_id)
+        if self.cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self._load_and_store(user_id)
+            finally:
+                self.cache.delete(lock_key)
+
+        self.lock_waits += 1
+        if stale is not None:
+            self.stale_served += 1
+            return self.serializer_class.from_dict(stale), stale
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            record = self.sessions.read_user(user_id)
+            if record is not None:
+                data = self.serializer_class.loads(record)
+                if isinstance(data, dict):
+                    return self.serializer_class.from_dict(data), data
+        return self._load_and_store(user_id)
+
+    def _load_and_store(self, user_id):
+        started = time.monotonic()
+        user = self.fetch(user_id)
+        self.loads += 1
+        data = self.store(user, delta=time.monotonic() - started)
+        return user, data
+
+    def fetch(self, user_id):
+        with contextlib.suppress(ObjectDoesNotExist, MultipleObjectsReturned):
+            return USER.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        raise AuthenticationFailed("user_not_found_or_invalid_school_id", code="user_not_found")
+
+    def snapshot(self, user, delta: float = None) -> dict:
+        """
+        Build the user snapshot together with its expiry metadata.
+        """
+        data = dict(self.serializer_class(user).data)
+        data["_expires_at"] = time.time() + self.timeout
+        if delta is not None:
+            data["_delta"] = delta
+        return data
+
+    def store(self, user, delta: float = None) -> dict:
+        """
+        Write the user snapshot and return it.
+        """
+        data = self.snapshot(user, delta=delta)
+        self.sessions.write_user(user.pk, data, self.timeout)
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "lock_waits": self.lock_waits,
+            "early_refreshes": self.early_refreshes,
+            "stale_served": self.stale_served,
+        }
@@ -0,0 +1,99 @@
+import contextlib
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import AuthenticationFailed
+
+
+USER = get_user_model()
+
+CACHED_FIELDS = (
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_staff",
+    "is_active",
+    "is_superuser",
+    "date_joined",
+)
+
+
+class CachedPrincipal:
+    """
+    Lightweight stand-in for the user model, built from the `user:{id}` cache record
+    so authenticated requests can resolve `request.user` without a database query.
+
+    Only the fields listed in `CACHED_FIELDS` are held on the object. Reading any other
+    attribute or method (`groups`, `has_perm`, `get_full_name`, ...) loads the full model
+    instance once through `instance` and delegates to it.
+
+    Like Django's `SimpleLazyObject`, the principal reports the user model as its
+    `__class__`, so it passes `isinstance` checks and can be assigned to foreign keys
+    (`serializer.save(created_by=request.user)`). The assignment itself reads `_state`,
+    which loads the full instance.
+    """
+    __slots__ = CACHED_FIELDS + ("_instance",)
+
+    is_authenticated = True
+    is_anonymous = False
+    _meta = USER._meta
+
+    def __init__(self, **fields):
+        self._instance = None
+        for name in CACHED_FIELDS:
+            if name in fields:
+                setattr(self, name, fields[name])
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        fields = {name: data[name] for name in CACHED_FIELDS if name in data}
+        if isinstance(fields.get("date_joined"), str):
+            fields["date_joined"] = parse_datetime(fields["date_joined"])
+        return cls(**fields)
+
+    @property
+    def __class__(self):
+        return USER
+
+    def __reduce__(self):
+        # pickle by the real class, not the reported one
+        fields = {}
+        for name in CACHED_FIELDS:
+            with contextlib.suppress(AttributeError):
+                fields[name] = object.__getattribute__(self, name)
+        return CachedPrincipal.from_dict, (fields,)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def instance(self):
+        if self._instance is None:
+            with contextlib.suppress(ObjectDoesNotExist, MultipleObjectsReturned):
+                self._instance = USER.objects.get(pk=self.id)
+                return self._instance
+            raise AuthenticationFailed("user_not_found_or_invalid_school_id", code="user_not_found")
+        return self._instance
+
+    def __getattr__(self, name):
+        # Only reached for attributes that are not cached on the principal.
+        if name.startswith("__") or name in ("id", "_instance"):
+            raise AttributeError(name)
+        return getattr(self.instance, name)
+
+    def __eq__(self, other):
+        if isinstance(other, (CachedPrincipal, USER)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+    def __repr__(self):
+        return f"<CachedPrincipal: {self.username}>"
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+from utils.cache.clients import blocking_client
+from utils.threads import ProcessThread, run_with_backoff
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Replicated, in-memory list of revoked session jtis.
+
+    When enabled (`AUTH_REVOCATION_BROADCAST`), every revocation done through
+    `core.auth.sessions.SessionStore` is appended to a Redis stream in the same
+    script that deletes the session records. Each worker tails that stream from a
+    background thread and keeps a `jti -> expiry` map, so revoked access tokens
+    are rejected from process memory without a Redis lookup.
+
+    A jti missing from the map is not proof of a live session: the session
+    record may have expired or been evicted, and a logout during an eviction
+    publishes nothing once the user's index is gone. Callers still confirm the
+    session record, in the round trip that fetches the user snapshot.
+
+    Entries are kept for the access-token lifetime: after that any access token
+    carrying the jti has expired anyway. On start (and after any stream error) the
+    worker replays the stream from one access-token lifetime ago, so messages
+    published while it was down are not lost.
+
+    `is_revoked` returns None until the first catch-up has completed, while the
+    stream is unreachable, and when no XREAD has returned for longer than the
+    block interval plus `read_margin` seconds (a stalled connection); callers
+    must then fall back to the Redis session check.
+    """
+
+    def __init__(self, enabled: bool = False, stream: str = "auth:revocations",
+                 maxlen: int = 100000, block_ms: int = 5000, read_margin: float = 5.0, backend=None):
+        self.enabled = enabled
+        self.stream = stream
+        self.maxlen = maxlen
+        self.block_ms = block_ms
+        self.read_timeout = block_ms / 1000 + read_margin
+        self.cache = backend or cache
+        self.retention = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._synced = False
+        self._last_read = 0.0
+        self._last_id = None
+        self._listener = ProcessThread("auth-revocation-listener", self._run, on_start=self._unsync)
+        self._next_purge = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            enabled=getattr(settings, "AUTH_REVOCATION_BROADCAST", False),
+            maxlen=getattr(settings, "AUTH_REVOCATION_STREAM_MAXLEN", 100000),
+        )
+
+    @property
+    def stream_key(self) -> str:
+        return self.cache.make_key(self.stream)
+
+    def get_client(self):
+        return self.cache.client.get_client(write=True)
+
+    def add(self, jtis, revoked_at: float = None):
+        if not self.enabled:
+            return
+        expires_at = (revoked_at or time.time()) + self.retention
+        with self._lock:
+            for jti in jtis:
+                self._revoked[jti] = max(expires_at, self._revoked.get(jti, 0.0))
+
+    def is_revoked(self, jti):
+        """
+        Return True/False from the local list, or None when the list is not in
+        sync and the caller has to ask Redis.
+        """
+        if not self.enabled:
+            return None
+
+        self.ensure_started()
+        if not self.in_sync():
+            return None
+
+        now = time.time()
+        if now >= self._next_purge:
+            self.purge(now)
+
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > now
+
+    def in_sync(self) -> bool:
+        return self._synced and time.monotonic() - self._last_read <= self.read_timeout
+
+    def purge(self, now: float = None):
+        now = now or time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._next_purge = now + 60
+
+    def ensure_started(self):
+        self._listener.ensure_started()
+
+    def _unsync(self):
+        self._synced = False
+
+    def _run(self):
+        run_with_backoff(self._session, self._lost)
+
+    def _session(self, connected):
+        client = blocking_client(self.cache, self.read_timeout)
+        self._catch_up(client)
+        connected()
+        self._listen(client)
+
+    def _lost(self):
+        self._synced = False
+        logger.exception("Revocation stream unavailable, falling back to Redis session checks.")
+
+    def _catch_up(self, client):
+        start = self._last_id or f"{int((time.time() - self.retention) * 1000)}-0"
+        while True:
+            entries = client.xrange(self.stream_key, min=start, count=1000)
+            # xrange is inclusive, skip the entry we already applied
+            if entries and self._decode(entries[0][0]) == self._last_id:
+                entries = entries[1:]
+            if not entries:
+                break
+            self._apply(entries)
+            start = self._last_id
+        if self._last_id is None:
+            self._last_id = start
+        self._last_read = time.monotonic()
+        self._synced = True
+
+    def _listen(self, client):
+        while True:
+            # a half-open connection raises redis.TimeoutError after read_timeout
+            response = client.xread({self.stream_key: self._last_id}, block=self.block_ms, count=1000)
+            self._last_read = time.monotonic()
+            for _, entries in response or ():
+                self._apply(entries)
+
+    def _apply(self, entries):
+        for entry_id, fields in entries:
+            entry_id = self._decode(entry_id)
+            jtis = self._decode(fields.get(b"jtis", fields.get("jtis", b"")))
+            # stream ids start with the publish time in milliseconds
+            revoked_at = int(entry_id.split("-")[0]) / 1000
+            self.add([jti for jti in jtis.split(",") if jti], revoked_at=revoked_at)
+            self._last_id = entry_id
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+
+revocation_list = RevocationList.from_settings()
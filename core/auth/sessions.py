@@ -0,0 +1,281 @@
+import redis
+from django.core.cache import cache
+
+from . import codec
+from .revocation import revocation_list
+
+# retries of a script call whose session index changed after it was read
+INDEX_RETRIES = 5
+
+# Deletes every session listed in a user's index set, the set itself and,
+# optionally, the cached user, and returns the revoked jtis. When publishing is
+# enabled the jtis are appended to the revocation stream in the same atomic step.
+# Every key is declared in KEYS: the caller reads the index first and passes the
+# session keys it expects; the script returns false (nil) when the index changed
+# in between, and the caller retries.
+# KEYS[1] = sessions:{user_id}, KEYS[2] = user:{user_id}, KEYS[3] = revocation stream,
+# KEYS[4..] = token:{user_id}:{jti} of every indexed session
+# ARGV[1] = "1" to delete the cached user, ARGV[2] = "1" to publish, ARGV[3] = stream maxlen,
+# ARGV[4] = user id, ARGV[5..] = jtis, in the order of KEYS[4..]
+REVOKE_ALL_SCRIPT = """
+local jtis = {unpack(ARGV, 5)}
+if redis.call('SCARD', KEYS[1]) ~= #jtis then
+    return false
+end
+for _, jti in ipairs(jtis) do
+    if redis.call('SISMEMBER', KEYS[1], jti) == 0 then
+        return false
+    end
+end
+for i = 4, #KEYS do
+    redis.call('DEL', KEYS[i])
+end
+redis.call('DEL', KEYS[1])
+if ARGV[1] == '1' then
+    redis.call('DEL', KEYS[2])
+end
+if ARGV[2] == '1' and #jtis > 0 then
+    redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[3], '*', 'user_id', ARGV[4], 'jtis', table.concat(jtis, ','))
+end
+return jtis
+"""
+
+# Issues a session in one atomic step: optionally evicts every live session of
+# the user (single login), stores the user snapshot, stores the session record
+# and registers its jti in the user's index. Returns the evicted jtis, or false
+# (nil) when evicting and the index no longer matches the jtis passed in.
+# KEYS[1] = sessions:{user_id}, KEYS[2] = token:{user_id}:{jti}, KEYS[3] = user:{user_id},
+# KEYS[4] = revocation stream, KEYS[5..] = token:{user_id}:{jti} of the sessions to evict
+# ARGV[1] = session record, ARGV[2] = user snapshot, ARGV[3] = timeout in seconds,
+# ARGV[4] = "1" to evict other sessions, ARGV[5] = jti, ARGV[6] = "1" to publish,
+# ARGV[7] = stream maxlen, ARGV[8] = user id, ARGV[9..] = jtis to evict, in the order of KEYS[5..]
+ISSUE_SCRIPT = """
+local evicted = {unpack(ARGV, 9)}
+if ARGV[4] == '1' then
+    if redis.call('SCARD', KEYS[1]) ~= #evicted then
+        return false
+    end
+    for _, jti in ipairs(evicted) do
+        if redis.call('SISMEMBER', KEYS[1], jti) == 0 then
+            return false
+        end
+    end
+    for i = 5, #KEYS do
+        redis.call('DEL', KEYS[i])
+    end
+    redis.call('DEL', KEYS[1])
+    if ARGV[6] == '1' and #evicted > 0 then
+        redis.call('XADD', KEYS[4], 'MAXLEN', '~', ARGV[7], '*', 'user_id', ARGV[8], 'jtis', table.concat(evicted, ','))
+    end
+end
+redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+redis.call('SADD', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return evicted
+"""
+
+
+class SessionStore:
+    """
+    Access layer for the auth records kept in the Redis cache.
+
+    Keys:
+        token:{user_id}:{jti}   session record of one issued refresh/access pair
+        user:{user_id}          cached snapshot of the user
+        sessions:{user_id}      set of the jtis of every live session of the user
+
+    The per-user index makes logout, blacklist and single-login eviction cost
+    O(sessions of that user) instead of a SCAN over the whole keyspace. Records
+    are read and written through the raw django-redis client, so keys are built
+    with `cache.make_key` and assume the default KEY_FUNCTION layout. The Lua
+    scripts receive every key they touch through KEYS (the session keys of the
+    index are read first and the script bails out if the index changed), so
+    proxies and clusters that route by declared keys see all of them.
+
+    Session records and user snapshots are stored in the binary format of
+    `core.auth.codec`. Records written by older code (pickled by the cache
+    client) are still decoded through the client until they expire.
+
+    Methods:
+        read(user_id, jti):
+            Fetches the session record and the cached user in one round trip
+            and returns them decoded as a `(session, user_record)` tuple.
+            Missing records are returned as None.
+        exists(user_id, jti):
+            Checks whether a session is still live.
+        read_user(user_id):
+            Fetches only the cached user, for `user_loader` refreshing a
+            snapshot.
+        write_user(user_id, user_record, timeout):
+            Stores the user snapshot.
+        delete_user(user_id):
+            Drops the user snapshot, so the next request reloads it.
+        issue(user_id, jti, record, user_record, timeout, single_login=False):
+            Stores the user snapshot and a new session in a single Lua call,
+            evicting the user's other sessions first when `single_login` is
+            set, and returns the evicted jtis.
+        add(user_id, jti, record, timeout):
+            Stores a session record and registers its jti in the user's index.
+        revoke(user_id, jti):
+            Deletes a single session.
+        revoke_all(user_id, include_user=False):
+            Atomically deletes every session of the user (and the cached user
+            when `include_user` is set) and returns the revoked jtis.
+
+    Revocations are published to the `revocation_list` stream when
+    `AUTH_REVOCATION_BROADCAST` is enabled.
+    """
+
+    def __init__(self, backend=None):
+        self.cache = backend or cache
+        self._revoke_all_script = None
+        self._issue_script = None
+
+    @staticmethod
+    def token_key(user_id, jti) -> str:
+        return f"token:{user_id}:{jti}"
+
+    @staticmethod
+    def user_key(user_id) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def index_key(user_id) -> str:
+        return f"sessions:{user_id}"
+
+    def get_client(self):
+        return self.cache.client.get_client(write=True)
+
+    def decode(self, value, decoder):
+        if value is None:
+            return None
+        if codec.is_encoded(value):
+            return decoder(value)
+        return self.cache.client.decode(value)
+
+    def read(self, user_id, jti):
+        make_key = self.cache.make_key
+        session, user_record = self.get_client().mget(
+            [make_key(self.token_key(user_id, jti)), make_key(self.user_key(user_id))]
+        )
+        return (
+            self.decode(session, codec.decode_session),
+            self.decode(user_record, codec.decode_user),
+        )
+
+    def exists(self, user_id, jti) -> bool:
+        return bool(self.get_client().exists(self.cache.make_key(self.token_key(user_id, jti))))
+
+    def read_user(self, user_id):
+        value = self.get_client().get(self.cache.make_key(self.user_key(user_id)))
+        return self.decode(value, codec.decode_user)
+
+    def write_user(self, user_id, user_record: dict, timeout: int):
+        self.get_client().set(
+            self.cache.make_key(self.user_key(user_id)), codec.encode_user(user_record), ex=timeout
+        )
+
+    def delete_user(self, user_id):
+        self.get_client().delete(self.cache.make_key(self.user_key(user_id)))
+
+    def issue(self, user_id, jti, record, user_record, timeout: int, single_login: bool = False) -> list:
+        client = self.get_client()
+        if self._issue_script is None:
+            self._issue_script = client.register_script(ISSUE_SCRIPT)
+
+        make_key = self.cache.make_key
+        keys = [
+            make_key(self.index_key(user_id)),
+            make_key(self.token_key(user_id, jti)),
+            make_key(self.user_key(user_id)),
+            revocation_list.stream_key,
+        ]
+        args = [
+            codec.encode_session(getattr(record, "payload", record)),
+            codec.encode_user(user_record),
+            timeout,
+            "1" if single_login else "0",
+            jti,
+            "1" if revocation_list.enabled else "0",
+            revocation_list.maxlen,
+            user_id,
+        ]
+        if single_login:
+            evicted = self._call_with_index(self._issue_script, client, user_id, keys, args)
+        else:
+            evicted = self._issue_script(keys=keys, args=args, client=client)
+        evicted = [jti.decode() if isinstance(jti, bytes) else jti for jti in evicted]
+        revocation_list.add(evicted)
+        return evicted
+
+    def add(self, user_id, jti, record, timeout: int):
+        make_key = self.cache.make_key
+        index_key = make_key(self.index_key(user_id))
+
+        pipe = self.get_client().pipeline(transaction=True)
+        pipe.set(
+            make_key(self.token_key(user_id, jti)),
+            codec.encode_session(getattr(record, "payload", record)),
+            ex=timeout,
+        )
+        pipe.sadd(index_key, jti)
+        pipe.expire(index_key, timeout)
+        pipe.execute()
+
+    def revoke(self, user_id, jti):
+        make_key = self.cache.make_key
+
+        pipe = self.get_client().pipeline(transaction=True)
+        pipe.delete(make_key(self.token_key(user_id, jti)))
+        pipe.srem(make_key(self.index_key(user_id)), jti)
+        if revocation_list.enabled:
+            pipe.xadd(
+                revocation_list.stream_key,
+                {"user_id": user_id, "jtis": jti},
+                maxlen=revocation_list.maxlen,
+                approximate=True,
+            )
+        pipe.execute()
+        revocation_list.add([jti])
+
+    def revoke_all(self, user_id, include_user: bool = False) -> list:
+        client = self.get_client()
+        if self._revoke_all_script is None:
+            self._revoke_all_script = client.register_script(REVOKE_ALL_SCRIPT)
+
+        make_key = self.cache.make_key
+        keys = [make_key(self.index_key(user_id)), make_key(self.user_key(user_id)), revocation_list.stream_key]
+        args = [
+            "1" if include_user else "0",
+            "1" if revocation_list.enabled else "0",
+            revocation_list.maxlen,
+            user_id,
+        ]
+        jtis = self._call_with_index(self._revoke_all_script, client, user_id, keys, args)
+        jtis = [jti.decode() if isinstance(jti, bytes) else jti for jti in jtis]
+        revocation_list.add(jtis)
+        return jtis
+
+    def _call_with_index(self, script, client, user_id, keys, args):
+        """
+        Run a script that deletes every session of the user, declaring the
+        session keys listed in the user's index as KEYS. The script refuses to
+        run (returns None) when the index changed since it was read.
+        """
+        make_key = self.cache.make_key
+        for _ in range(INDEX_RETRIES):
+            jtis = [
+                jti.decode() if isinstance(jti, bytes) else jti
+                for jti in client.smembers(keys[0])
+            ]
+            result = script(
+                keys=keys + [make_key(self.token_key(user_id, jti)) for jti in jtis],
+                args=args + jtis,
+                client=client,
+            )
+            if result is not None:
+                return result
+        raise redis.WatchError(f"Session index of user {user_id} kept changing.")
+
+session_store = SessionStore()
@@ -0,0 +1,79 @@
+import hashlib
+import time
+from django.conf import settings
+
+from utils.cache.lru import LRUCache
+
+
+class VerifiedTokenCache:
+    """
+    Per-worker cache of access tokens that already passed signature
+    verification, the session check and user resolution.
+
+    Entries are keyed by a SHA-256 digest of the raw token, so the bearer
+    string itself is never kept in memory, and hold the decoded token together
+    with the resolved principal. An entry lives for at most `ttl` seconds and
+    never past the token's own `exp`.
+
+    Revocation is honoured in two ways:
+        - every worker drops its entries after the short TTL, and
+        - `invalidate_user` evicts a user's entries immediately in the worker
+          that handled the logout / single-login / blacklist call.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 5.0):
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            maxsize=getattr(settings, "AUTH_TOKEN_CACHE_MAXSIZE", 4096),
+            ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 5.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self._cache.maxsize > 0
+
+    @staticmethod
+    def digest(raw_token) -> str:
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).hexdigest()
+
+    def get(self, raw_token):
+        """
+        Return the cached `(token, user)` pair or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        return self._cache.get(self.digest(raw_token))
+
+    def set(self, raw_token, token, user):
+        if not self.enabled:
+            return
+
+        ttl = self.ttl
+        exp = token.payload.get("exp")
+        if exp:
+            ttl = min(ttl, exp - time.time())
+        self._cache.set(self.digest(raw_token), (token, user), ttl=ttl)
+
+    def invalidate(self, raw_token):
+        self._cache.pop(self.digest(raw_token))
+
+    def invalidate_user(self, user_id) -> int:
+        user_id = str(user_id)
+        return self._cache.discard_where(
+            lambda entry: str(entry[0].payload.get("user_id")) == user_id
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+verified_token_cache = VerifiedTokenCache.from_settings()
@@ -12,6 +12,17 @@ class TimeStampedModels(models.Model):
         abstract = True
 
 
+def keyset_index(name: str, fields=("created", "id")) -> models.Index:
+    """
+    Composite B-tree index backing `core.base.base_views.KeysetPagination` on
+    `fields`, usable for both scan directions. Add it to the model's
+    `Meta.indexes`; on large tables switch the generated `AddIndex` to
+    `django.contrib.postgres.operations.AddIndexConcurrently` in a
+    non-atomic migration.
+    """
+    return models.Index(fields=list(fields), name=name)
+
+
 class UserCreatorModels(TimeStampedModels):
     """
     Abstract base class that provides a 'created_by' field.
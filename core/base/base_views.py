@@ -1,5 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page as DjangoPage, PageNotAnInteger, Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from utils.api import fastjson
+from utils.api.counting import approximate_count
 from utils.api.generics import (
     ListAPIView,
     ListCreateAPIView,
@@ -22,6 +34,211 @@ class CustomPagination(PageNumberPagination):
     # page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
 
 
+class ApproximateCountPage(DjangoPage):
+    def has_next(self):
+        if not self.paginator.approximate:
+            return super().has_next()
+        # the estimate says nothing about the rows past this page, ask for one
+        top = self.number * self.paginator.per_page
+        return self.paginator.object_list[top:top + 1].exists()
+
+
+class ApproximateCountPaginator(DjangoPaginator):
+    """
+    Django paginator whose count comes from `utils.api.counting.approximate_count`.
+
+    With an approximate count, pages are sliced by `per_page` alone and `next`
+    is decided by the rows actually present, so an estimate below the real row
+    count does not cut pages short.
+    """
+    threshold = None
+    timeout = None
+    approximate = False
+
+    @cached_property
+    def count(self):
+        count, self.approximate = approximate_count(self.object_list, self.threshold, self.timeout)
+        return count
+
+    def validate_number(self, number):
+        # an estimate can be short of the real number of pages, only check the lower bound
+        if not self.count or not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return ApproximateCountPage(*args, **kwargs)
+
+
+class ApproximateCountPagination(CustomPagination):
+    """
+    Page number pagination that only counts exactly below
+    API_EXACT_COUNT_THRESHOLD rows and otherwise reports a planner estimate or a
+    cached count, flagged with `approximate` in the response.
+    """
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "approximate": self.page.paginator.approximate,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["approximate"] = {"type": "boolean"}
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on a unique ordering, `("-created", "-id")` of
+    `TimeStampedModels` by default.
+
+    Pages are selected with `WHERE (created, id) < (last row)` instead of an
+    OFFSET, and no COUNT is run, so page N costs the same as page 1 when the
+    ordering is backed by an index (see `core.base.base_models.keyset_index`).
+    `next`/`previous` carry opaque cursors and `count` is always None.
+
+    Views can override the ordering with `keyset_ordering`; the last field must
+    be unique and none of the fields may be null.
+    """
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-created", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = tuple(getattr(view, "keyset_ordering", None) or self.ordering)
+        self.fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+        self.base_url = request.build_absolute_uri()
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [self._flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size) if self.max_page_size else size
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    @staticmethod
+    def _flip(name: str) -> str:
+        return name[1:] if name.startswith("-") else f"-{name}"
+
+    def seek(self, ordering, position) -> Q:
+        """
+        Rows strictly after `position` in `ordering`, expanded as
+        (a > x) OR (a = x AND b > y) ... with a leading range on the first
+        field so the index range scan starts at the cursor.
+        """
+        lookups = [
+            (name.lstrip("-"), "lt" if name.startswith("-") else "gt", value)
+            for name, value in zip(ordering, position)
+        ]
+        condition = Q()
+        equal = Q()
+        for field, lookup, value in lookups:
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        first_field, first_lookup, first_value = lookups[0]
+        return Q(**{f"{first_field}__{first_lookup}e": first_value}) & condition
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        values = [field.value_to_string(row) for field in self.fields]
+        raw = fastjson.dumps({"p": values, "r": int(reverse)})
+        token = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = fastjson.loads(raw)
+            values = data["p"]
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(data.get("r"))
+        except (binascii.Error, KeyError, TypeError, ValueError, ValidationError, fastjson.DecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": None,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "nullable": True},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
 # --------------------------------------- Views -------------------------------------- #
 
 
@@ -36,3 +253,11 @@ class CustomCreateAPIView(CreateAPIView):
 class CustomListAPIView(ListAPIView):
     pagination_class = CustomPagination
     schema = CustomAutoSchema(_api_type="List")
+
+
+class CustomKeysetListAPIView(CustomListAPIView):
+    pagination_class = KeysetPagination
+
+
+class CustomApproximateListAPIView(CustomListAPIView):
+    pagination_class = ApproximateCountPagination
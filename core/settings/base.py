@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 from django.utils.timezone import timedelta
 
@@ -203,8 +203,12 @@ REST_FRAMEWORK = {
     # "DEFAULT_PAGINATION_CLASS": "core.base.views.CustomPagination",
     "PAGE_SIZE": 10,
     "EXCEPTION_HANDLER": "utils.api.exception_handler.detailed_exception_handler",
+    "DEFAULT_RENDERER_CLASSES": [
+        "utils.api.renderers.EnvelopeJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "utils.api.parsers.FastJSONParser",
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
@@ -218,9 +222,75 @@ REST_FRAMEWORK = {
 }
 
 
+# Largest JSON request body accepted by utils.api.parsers.FastJSONParser, in bytes.
+API_MAX_JSON_BODY_SIZE = config("API_MAX_JSON_BODY_SIZE", default=2621440, cast=int)
+
+
+# Counts of ApproximateCountPagination (utils.api.counting): exact below the threshold,
+# planner estimate or a cached count (seconds) above it.
+API_EXACT_COUNT_THRESHOLD = config("API_EXACT_COUNT_THRESHOLD", default=10000, cast=int)
+API_COUNT_CACHE_TTL = config("API_COUNT_CACHE_TTL", default=300, cast=int)
+
+
+# Log the select_related/prefetch_related/only plan of every optimized generic view (utils.api.optimizer).
+API_QUERYSET_OPTIMIZER_DEBUG = config("API_QUERYSET_OPTIMIZER_DEBUG", default=False, cast=bool)
+
+
 # TODO: Add IS_SINGLE_LOGIN setting - referenced in core/auth/backend.py but not defined
 # IS_SINGLE_LOGIN = config("IS_SINGLE_LOGIN", default=False, cast=bool)
 
+# Per-worker cache of verified access tokens (core.auth.token_cache).
+# Set AUTH_TOKEN_CACHE_TTL to 0 to disable it.
+AUTH_TOKEN_CACHE_MAXSIZE = config("AUTH_TOKEN_CACHE_MAXSIZE", default=4096, cast=int)
+AUTH_TOKEN_CACHE_TTL = config("AUTH_TOKEN_CACHE_TTL", default=5.0, cast=float)
+
+# Broadcast session revocations over a Redis stream and check access tokens
+# against a per-worker copy of it (core.auth.revocation).
+AUTH_REVOCATION_BROADCAST = config("AUTH_REVOCATION_BROADCAST", default=False, cast=bool)
+AUTH_REVOCATION_STREAM_MAXLEN = config("AUTH_REVOCATION_STREAM_MAXLEN", default=100000, cast=int)
+
+# Stampede protection for user snapshot reloads (core.auth.loader).
+# Set AUTH_USER_EARLY_REFRESH_BETA to 0 to disable probabilistic early refresh.
+AUTH_USER_LOAD_LOCK_TIMEOUT = config("AUTH_USER_LOAD_LOCK_TIMEOUT", default=5, cast=int)
+AUTH_USER_LOAD_WAIT_TIMEOUT = config("AUTH_USER_LOAD_WAIT_TIMEOUT", default=2.0, cast=float)
+AUTH_USER_EARLY_REFRESH_BETA = config("AUTH_USER_EARLY_REFRESH_BETA", default=1.0, cast=float)
+
+# Write-behind buffer for last_login (core.auth.last_login).
+# Set AUTH_LAST_LOGIN_FLUSH_INTERVAL to 0 to write it during the login request.
+AUTH_LAST_LOGIN_FLUSH_INTERVAL = config("AUTH_LAST_LOGIN_FLUSH_INTERVAL", default=10.0, cast=float)
+AUTH_LAST_LOGIN_MAX_PENDING = config("AUTH_LAST_LOGIN_MAX_PENDING", default=1000, cast=int)
+
+# Process pool for login password hashing (core.auth.hashing).
+# AUTH_PASSWORD_POOL_SIZE = 0 hashes on the request thread.
+AUTH_PASSWORD_POOL_SIZE = config("AUTH_PASSWORD_POOL_SIZE", default=0, cast=int)
+AUTH_PASSWORD_POOL_MAX_QUEUE = config("AUTH_PASSWORD_POOL_MAX_QUEUE", default=0, cast=int)
+AUTH_PASSWORD_POOL_TIMEOUT = config("AUTH_PASSWORD_POOL_TIMEOUT", default=10.0, cast=float)
+
+# Seconds a login for an unknown username/email is answered without a DB query.
+AUTH_LOGIN_NEGATIVE_CACHE_TTL = config("AUTH_LOGIN_NEGATIVE_CACHE_TTL", default=60, cast=int)
+
+# Per-worker first tier of utils.cache.cache_manager.CacheManager, kept coherent
+# across workers over Redis pub/sub. Set CACHE_MANAGER_LOCAL_MAXSIZE to 0 to disable it.
+CACHE_MANAGER_LOCAL_MAXSIZE = config("CACHE_MANAGER_LOCAL_MAXSIZE", default=10000, cast=int)
+CACHE_MANAGER_LOCAL_TTL = config("CACHE_MANAGER_LOCAL_TTL", default=30.0, cast=float)
+CACHE_MANAGER_INVALIDATION = config("CACHE_MANAGER_INVALIDATION", default=True, cast=bool)
+# Seconds a worker trusts its copy of a prefix generation when an invalidation message is missed.
+CACHE_MANAGER_GENERATION_TTL = config("CACHE_MANAGER_GENERATION_TTL", default=5.0, cast=float)
+
+# Read-through cache of generic views with cache_queryset = True (utils.cache.query_cache).
+# Models are registered by the views that cache them; processes that write to them
+# without loading the URLconf (commands, workers) need them listed in QUERY_CACHE_MODELS.
+QUERY_CACHE_TTL = config("QUERY_CACHE_TTL", default=60, cast=int)
+QUERY_CACHE_MODELS = config("QUERY_CACHE_MODELS", default="", cast=Csv())
+
+# Circuit breaker around the auth cache calls (core.auth.circuit_breaker). While it is open,
+# sessions a worker confirmed within AUTH_DEGRADED_SESSIONS_TTL seconds are served from the database.
+AUTH_CACHE_BREAKER_FAILURES = config("AUTH_CACHE_BREAKER_FAILURES", default=5, cast=int)
+AUTH_CACHE_BREAKER_SLOW_CALL = config("AUTH_CACHE_BREAKER_SLOW_CALL", default=0.25, cast=float)
+AUTH_CACHE_BREAKER_RESET_TIMEOUT = config("AUTH_CACHE_BREAKER_RESET_TIMEOUT", default=10.0, cast=float)
+AUTH_DEGRADED_SESSIONS_MAXSIZE = config("AUTH_DEGRADED_SESSIONS_MAXSIZE", default=10000, cast=int)
+AUTH_DEGRADED_SESSIONS_TTL = config("AUTH_DEGRADED_SESSIONS_TTL", default=300.0, cast=float)
+
 # Django cache and redis
 REDIS_HOST = config("REDIS_HOST")
 REDIS_PORT = config("REDIS_PORT", default=6379, cast=int)
@@ -231,9 +301,16 @@ if REDIS_USERNAME and REDIS_PASSWORD:
     REDIS_URL = f"redis://{REDIS_USERNAME}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 else:
     REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+# Request-path calls give up quickly instead of blocking workers on a slow Redis.
+REDIS_SOCKET_CONNECT_TIMEOUT = config("REDIS_SOCKET_CONNECT_TIMEOUT", default=1.0, cast=float)
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=0.5, cast=float)
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": REDIS_URL,
+        "OPTIONS": {
+            "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_CONNECT_TIMEOUT,
+            "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+        },
     }
 }
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Compiled output for read-only ModelSerializer list responses.
+
+DRF renders every row through `field.get_attribute` and `field.to_representation`
+for each field. For a given serializer layout most of that work is the same on
+every row, so it is generated once as a plain Python function: model columns are
+read as attributes (or straight from `values_list()` tuples) and the common
+field types are converted inline. Anything else is delegated to the DRF field
+itself, so the output is the same as `Serializer.to_representation`.
+"""
+import keyword
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from django.db.models.manager import BaseManager
+from django.db.models.query import ModelIterable
+from django.db.models.query_utils import DeferredAttribute
+from rest_framework import fields as drf_fields
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from rest_framework.serializers import ListSerializer, ModelSerializer, Serializer
+
+MAX_LAYOUTS = 256
+
+_STR = "value if value.__class__ is str else str(value)"
+
+# exact DRF field classes whose to_representation is inlined, `{field}` being the bound field
+INLINE = {
+    drf_fields.CharField: _STR,
+    drf_fields.EmailField: _STR,
+    drf_fields.SlugField: _STR,
+    drf_fields.URLField: _STR,
+    drf_fields.IntegerField: "value if value.__class__ is int else int(value)",
+    drf_fields.FloatField: "float(value)",
+    drf_fields.BooleanField: "value if value.__class__ is bool else {field}.to_representation(value)",
+    drf_fields.ReadOnlyField: "value",
+}
+
+COLUMN, PK, FALLBACK = "column", "pk", "fallback"
+
+_compiled = {}
+
+
+def readable_fields(serializer) -> list:
+    return [field for field in serializer.fields.values() if not field.write_only]
+
+
+def layout(serializer) -> tuple:
+    return type(serializer), tuple(
+        (field.field_name, type(field), field.source) for field in readable_fields(serializer)
+    )
+
+
+def _attribute(model_field):
+    attname = model_field.attname
+    if attname.isidentifier() and not keyword.iskeyword(attname):
+        return attname
+    return None
+
+
+def classify(field, model):
+    """
+    Return `(kind, attname, values_ok)` for one readable field: COLUMN for a plain
+    model column, PK for a primary key related field on a forward foreign key
+    (read from `<name>_id`), FALLBACK for anything DRF has to resolve itself.
+    """
+    source = field.source
+    if isinstance(field, Serializer) or source == "*" or "." in source:
+        return FALLBACK, None, False
+    try:
+        model_field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return FALLBACK, None, False
+    if not model_field.concrete or model_field.name != source:
+        return FALLBACK, None, False
+
+    attname = _attribute(model_field)
+    if attname is None:
+        return FALLBACK, None, False
+
+    if not model_field.is_relation:
+        if type(field).get_attribute is not Field.get_attribute:
+            return FALLBACK, None, False
+        # descriptors such as FileDescriptor wrap the column value
+        return COLUMN, attname, model_field.descriptor_class is DeferredAttribute
+
+    if (
+        type(field) is PrimaryKeyRelatedField
+        and field.pk_field is None
+        and field.use_pk_only_optimization()
+        and (model_field.many_to_one or model_field.one_to_one)
+    ):
+        return PK, attname, True
+    return FALLBACK, None, False
+
+
+def _assign(index, field, kind, read):
+    name = repr(field.field_name)
+    if kind == FALLBACK:
+        return [
+            "try:",
+            f"    attribute = f{index}.get_attribute(instance)",
+            "except SkipField:",
+            "    pass",
+            "else:",
+            "    check = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute",
+            f"    ret[{name}] = None if check is None else f{index}.to_representation(attribute)",
+        ]
+    if kind == PK:
+        # PrimaryKeyRelatedField renders PKOnlyObject(pk).pk
+        return [f"ret[{name}] = {read}"]
+
+    convert = INLINE.get(type(field), "{field}.to_representation(value)").format(field=f"f{index}")
+    return [f"value = {read}", f"ret[{name}] = None if value is None else {convert}"]
+
+
+def generate(serializer, model):
+    """
+    Return the source of `bind(f0, f1, ...)`, returning the row function for a
+    serializer's bound fields, and the `values_list()` columns when every field
+    can be read from them (None otherwise).
+    """
+    fields = readable_fields(serializer)
+    kinds = [classify(field, model) for field in fields]
+    params = ", ".join(f"f{index}" for index in range(len(fields)))
+
+    lines = [f"def bind({params}):", "    def render(instance):", "        ret = {}"]
+    for index, (field, (kind, attname, _)) in enumerate(zip(fields, kinds)):
+        lines += [f"        {line}" for line in _assign(index, field, kind, f"instance.{attname}")]
+    lines += ["        return ret", "    return render"]
+
+    columns = None
+    if all(values_ok for _, _, values_ok in kinds):
+        columns = [attname for _, attname, _ in kinds]
+        lines += [f"def bind_values({params}):", "    def render(row):", "        ret = {}"]
+        for index, (field, (kind, _, _)) in enumerate(zip(fields, kinds)):
+            lines += [f"        {line}" for line in _assign(index, field, kind, f"row[{index}]")]
+        lines += ["        return ret", "    return render"]
+
+    return "\n".join(lines) + "\n", columns
+
+
+class CompiledSerializer:
+    """
+    Row-to-dict functions generated for one serializer layout (class and readable
+    fields). `bind()` ties them to the fields of a serializer instance, so
+    context dependent fields keep working.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.source, self.columns = generate(serializer, self.model)
+        namespace = {"SkipField": SkipField, "PKOnlyObject": PKOnlyObject}
+        exec(compile(self.source, f"<compiled {type(serializer).__qualname__}>", "exec"), namespace)
+        self._bind = namespace["bind"]
+        self._bind_values = namespace.get("bind_values")
+
+    def bind(self, serializer):
+        return self._bind(*readable_fields(serializer))
+
+    def bind_values(self, serializer):
+        return self._bind_values(*readable_fields(serializer))
+
+
+def compile_serializer(serializer):
+    """
+    Return the CompiledSerializer of a ModelSerializer instance, generated once
+    per layout, or None when the serializer customizes `to_representation`.
+    """
+    if not isinstance(serializer, ModelSerializer):
+        return None
+    if type(serializer).to_representation is not Serializer.to_representation:
+        return None
+
+    key = layout(serializer)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        if len(_compiled) >= MAX_LAYOUTS:
+            # sparse fieldsets give one layout per field combination
+            _compiled.clear()
+        compiled = _compiled[key] = CompiledSerializer(serializer)
+    return compiled
+
+
+class CompiledListSerializer(ListSerializer):
+    """
+    ListSerializer rendering its rows with the compiled function of its child.
+
+    Opt in from a read-only ModelSerializer with
+    `Meta.list_serializer_class = CompiledListSerializer`. Unevaluated querysets
+    whose fields are all columns are read with `values_list()`, without building
+    model instances.
+    """
+
+    def to_representation(self, data):
+        compiled = compile_serializer(self.child)
+        if compiled is None:
+            return super().to_representation(data)
+
+        if isinstance(data, BaseManager):
+            data = data.all()
+        if (
+            compiled.columns is not None
+            and isinstance(data, QuerySet)
+            and data._result_cache is None
+            and data._iterable_class is ModelIterable
+        ):
+            render = compiled.bind_values(self.child)
+            return [render(row) for row in data.values_list(*compiled.columns)]
+
+        render = compiled.bind(self.child)
+        model = compiled.model
+        fallback = self.child.to_representation
+        return [render(item) if isinstance(item, model) else fallback(item) for item in data]
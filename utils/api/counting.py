@@ -0,0 +1,79 @@
+"""
+Row counts for paginated list responses that avoid a full COUNT(*) on large tables.
+"""
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+
+from utils.api import fastjson
+from utils.cache.query_cache import list_cache, query_hash, register
+
+EXACT_COUNT_THRESHOLD = getattr(settings, "API_EXACT_COUNT_THRESHOLD", 10000)
+COUNT_CACHE_TTL = getattr(settings, "API_COUNT_CACHE_TTL", 300)
+
+
+def is_unfiltered(queryset) -> bool:
+    query = queryset.query
+    return not query.where and not query.distinct and not query.combinator
+
+
+def planner_estimate(queryset):
+    """
+    Row estimate from the Postgres planner: pg_class.reltuples for a whole
+    table, the EXPLAIN row estimate otherwise. None when not available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        if is_unfiltered(queryset):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            estimate = row[0] if row else None
+        else:
+            plan = fastjson.loads(queryset.order_by().explain(format="json"))
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+    except (DatabaseError, EmptyResultSet, KeyError, IndexError, ValueError):
+        return None
+
+    # reltuples is -1 for tables that were never vacuumed or analyzed
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+def approximate_count(queryset, threshold: int = None, timeout: int = None):
+    """
+    Return `(count, approximate)` for `queryset`.
+
+    Results the planner expects to stay under `threshold` rows are counted
+    exactly. Above it, whole tables use the planner estimate and filtered
+    querysets use an exact count cached in the model's list namespace for
+    `timeout` seconds. A count served from that cache may be stale (writes
+    from processes that never registered the model do not reset it), so it is
+    reported as approximate.
+    """
+    threshold = EXACT_COUNT_THRESHOLD if threshold is None else threshold
+    timeout = COUNT_CACHE_TTL if timeout is None else timeout
+
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate < threshold:
+        return queryset.count(), False
+    if estimate is not None and is_unfiltered(queryset):
+        return estimate, True
+
+    key = query_hash(queryset.order_by())
+    if key is None:
+        return 0, False
+
+    register(queryset.model)
+    manager = list_cache(queryset.model)
+    count = manager.get(f"count:{key}")
+    if count is not None:
+        return count, True
+    count = queryset.count()
+    manager.set(f"count:{key}", count, timeout)
+    return count, False
@@ -3,7 +3,7 @@ from rest_framework import status
 from rest_framework.exceptions import APIException
 
 """
-DEPRECATED: We dont use this file anymore.
+DEPRECATED: We dont use this file anymore, except for ServiceUnavailable and PayloadTooLarge.
 """
 
 
@@ -21,3 +21,12 @@ class ServiceUnavailable(APIException):
     status_code = status.HTTP_503_SERVICE_UNAVAILABLE
     default_detail = _("Service unavailable, please check again later.")
     default_code = "service_unavailable"
+
+
+# --------------------------------- Requests --------------------------------- #
+class PayloadTooLarge(APIException):
+    """Request body is over the configured size limit"""
+
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("Request body is too large.")
+    default_code = "payload_too_large"
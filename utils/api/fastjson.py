@@ -0,0 +1,92 @@
+"""
+JSON encoding for API responses, backed by orjson when it is installed and by
+the standard library otherwise.
+
+orjson is an optional dependency (`pip install orjson`); it is not listed in
+pyproject.toml, so the standard library backend is the default.
+
+Both backends go through `default()` for the values JSON has no type for and
+follow `LazyEncoder` and DRF `JSONEncoder` semantics: lazy translation strings
+become str, Decimal becomes str, datetimes are ISO 8601 with millisecond
+precision and "Z" for UTC, times and timedeltas as in `DjangoJSONEncoder`,
+UUIDs are strings, bytes are decoded and sets, querysets and other iterables
+become arrays. Non-str dict keys are converted the way `json.dumps` does.
+"""
+import datetime
+import decimal
+import json
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class LazyEncoder(DjangoJSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Promise):
+            return force_str(obj)
+        return super().default(obj)
+
+
+_encoder = LazyEncoder()
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    DecodeError = orjson.JSONDecodeError
+else:
+    OPTIONS = 0
+    DecodeError = ValueError
+
+
+def default(obj):
+    """
+    Fallback for the values neither backend encodes the way `LazyEncoder` does.
+    """
+    if isinstance(obj, (Promise, decimal.Decimal, datetime.datetime, datetime.date,
+                        datetime.time, datetime.timedelta, uuid.UUID)):
+        return _encoder.default(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    # querysets, generators and other iterables
+    if hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes)):
+        return tuple(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+class _FallbackEncoder(json.JSONEncoder):
+    def default(self, obj):
+        return default(obj)
+
+
+def _escape_line_separators(content: bytes) -> bytes:
+    # U+2028 and U+2029 are valid JSON but not valid JavaScript string literals
+    if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+        content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return content
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        try:
+            return _escape_line_separators(orjson.dumps(data, default=default, option=OPTIONS))
+        except orjson.JSONEncodeError as exc:
+            # integers over 64 bits and other values orjson refuses
+            if isinstance(exc.__cause__, TypeError):
+                raise exc.__cause__
+    content = json.dumps(data, cls=_FallbackEncoder, ensure_ascii=False, separators=(",", ":"))
+    return _escape_line_separators(content.encode())
+
+
+def loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode()
+    return json.loads(content)
@@ -0,0 +1,181 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer, Serializer
+
+from utils.api.optimizer import required_columns
+
+ALL_FIELDS = "__all__"
+
+
+def parse_paths(value) -> list:
+    return [path.strip() for path in (value or "").split(",") if path.strip()]
+
+
+def build_tree(paths) -> dict:
+    """
+    Turn dotted paths into a nested dict, an empty dict meaning the whole field.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for index, part in enumerate(parts):
+            if index == len(parts) - 1:
+                node[part] = {}
+            elif node.get(part) == {} and part in node:
+                # "a" and "a.b" both requested, "a" wins
+                break
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def nested_fields(field):
+    if isinstance(field, ListSerializer):
+        field = field.child
+    if isinstance(field, Serializer):
+        return field.fields
+    return None
+
+
+def unknown_paths(fields, tree, prefix="") -> list:
+    unknown = []
+    for name, subtree in tree.items():
+        path = f"{prefix}{name}"
+        if name not in fields:
+            unknown.append(path)
+            continue
+        if subtree:
+            children = nested_fields(fields[name])
+            if children is None:
+                unknown.extend(f"{path}.{child}" for child in subtree)
+            else:
+                unknown.extend(unknown_paths(children, subtree, f"{path}."))
+    return unknown
+
+
+def is_allowed(path: str, allowed) -> bool:
+    if allowed == ALL_FIELDS:
+        return True
+    return any(path == item or path.startswith(f"{item}.") for item in allowed)
+
+
+def prune(fields, include=None, exclude=None):
+    """
+    Remove the fields outside `include` and inside `exclude` from a serializer's
+    field mapping, recursing into nested serializers.
+    """
+    if include:
+        for name in list(fields):
+            if name not in include:
+                fields.pop(name)
+
+    for name in list(fields):
+        sub_include = include.get(name) if include else None
+        sub_exclude = exclude.get(name) if exclude else None
+        if exclude and name in exclude and not sub_exclude:
+            fields.pop(name)
+            continue
+        if sub_include or sub_exclude:
+            children = nested_fields(fields[name])
+            if children is not None:
+                prune(children, sub_include, sub_exclude)
+
+
+class SparseFieldsetMixin:
+    """
+    Let GET requests choose the serialized fields with `?fields=` or
+    `?exclude=`, as comma separated (dotted for nested serializers) paths.
+
+    Views opt in by declaring `sparse_fields`: the paths clients may request,
+    or "__all__". Unknown or not allowed paths are rejected with a 400. The
+    serializer field tree is pruned, and when every remaining field maps to a
+    column of the model the queryset is narrowed with `.only()` as well,
+    keeping the lookup, ordering and keyset pagination columns and
+    `optimize_extra_columns`.
+    """
+    sparse_fields = None
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def get_sparse_fieldset(self):
+        """
+        Return the validated `(include, exclude)` trees of the request, or None.
+        """
+        if hasattr(self, "_sparse_fieldset"):
+            return self._sparse_fieldset
+
+        self._sparse_fieldset = None
+        request = getattr(self, "request", None)
+        if not self.sparse_fields or request is None or request.method not in ("GET", "HEAD"):
+            return None
+
+        include_paths = parse_paths(request.query_params.get(self.fields_query_param))
+        exclude_paths = parse_paths(request.query_params.get(self.exclude_query_param))
+        if not include_paths and not exclude_paths:
+            return None
+
+        fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        include = build_tree(include_paths) if include_paths else None
+        exclude = build_tree(exclude_paths) if exclude_paths else None
+
+        errors = {}
+        for param, paths, tree in (
+            (self.fields_query_param, include_paths, include),
+            (self.exclude_query_param, exclude_paths, exclude),
+        ):
+            if not paths:
+                continue
+            invalid = unknown_paths(fields, tree)
+            invalid += [path for path in paths if path not in invalid and not is_allowed(path, self.sparse_fields)]
+            if invalid:
+                errors[param] = [f"Unknown or not allowed field(s): {', '.join(invalid)}."]
+        if errors:
+            raise ValidationError(errors)
+
+        self._sparse_fieldset = (include, exclude)
+        return self._sparse_fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            fields = nested_fields(serializer)
+            if fields is not None:
+                prune(fields, *fieldset)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_sparse_fieldset()
+        # the queryset optimizer projects the pruned serializer itself, joins included
+        if fieldset is None or getattr(self, "optimize_queryset", False):
+            return queryset
+
+        columns = self.get_projection(queryset, fieldset)
+        return queryset.only(*columns) if columns else queryset
+
+    def get_projection(self, queryset, fieldset):
+        """
+        Columns to load for the pruned serializer and the view itself, None when
+        a remaining field is not a plain column (method fields, dotted sources,
+        reverse or many-to-many relations).
+        """
+        fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        prune(fields, *fieldset)
+
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        columns |= required_columns(self, queryset, getattr(self, "optimize_extra_columns", ()))
+        for field in fields.values():
+            source = field.source
+            if source == "*" or "." in source:
+                return None
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            columns.add(model_field.name)
+        return sorted(columns)
@@ -1,10 +1,12 @@
 import logging
 import re
-from django.db import IntegrityError
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import IntegrityError, connections, router, transaction
 from django.http.request import QueryDict
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError, NotAuthenticated
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 from rest_framework.generics import (
     CreateAPIView as CreateView,
     ListAPIView as ListView,
@@ -13,6 +15,11 @@ from rest_framework.generics import (
     UpdateAPIView as UpdateView,
 )
 
+from utils.api.fieldsets import SparseFieldsetMixin
+from utils.api.optimizer import QuerysetOptimizerMixin
+from utils.api.streaming import StreamingListMixin
+from utils.cache.query_cache import QueryCacheMixin, invalidate_instance, invalidate_model, is_registered
+
 logger = logging.getLogger(__name__)  # TODO: replace to struclog wait setup from Rede
 
 
@@ -20,6 +27,16 @@ logger = logging.getLogger(__name__)  # TODO: replace to struclog wait setup fro
 pattern = r"\(([^)]+)\)=\(([^)]+)\)"
 
 
+def integrity_error_field(exc: IntegrityError):
+    """
+    Return the `(key, value)` pair named in a unique violation message, or None.
+    """
+    match = re.search(pattern, exc.args[0]) if exc.args else None
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+
 def secure_query_dict(data: QueryDict):
     copy_data = data.copy()
     # check if data has password and pop it
@@ -51,11 +68,9 @@ class LoggingViewMixins:
         try:
             self.perform_create(serializer)
         except IntegrityError as exc:
-            # search key and value from error string
-            match = re.search(pattern, exc.args[0])
-            if match:
-                key = match.group(1)
-                value = match.group(2)
+            field = integrity_error_field(exc)
+            if field:
+                key, value = field
                 logger.warning("Duplicate Data: {value}".format(value=value))
                 raise ValidationError({key: ["Already exists."]})
 
@@ -96,11 +111,9 @@ class LoggingViewMixins:
         try:
             self.perform_update(serializer)
         except IntegrityError as exc:
-            # search key and value from error string
-            match = re.search(pattern, exc.args[0])
-            if match:
-                key = match.group(1)
-                value = match.group(2)
+            field = integrity_error_field(exc)
+            if field:
+                key, value = field
                 logger.warning("Duplicate Data: {value}".format(value=value))
                 raise ValidationError({key: ["Already exists."]})
 
@@ -117,7 +130,37 @@ class LoggingViewMixins:
 class CreateAPIView(CreateView):
     """
     Concrete view for creating a model instance.
+
+    Declaring `upsert_conflict_fields` (the unique fields identifying a row)
+    switches the view to upsert mode: the row is written with a single
+    `INSERT ... ON CONFLICT DO UPDATE` of `upsert_update_fields` (every other
+    submitted field by default, never the `get_upsert_extra()` ones) instead
+    of failing on duplicates, and the response is 201 when the row was created
+    or 200 when it was updated. Serializers used for upserts must not have
+    many-to-many fields, and the conflict fields are required.
     """
+    upsert_conflict_fields = ()
+    upsert_update_fields = None
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.upsert_conflict_fields and not kwargs.get("many"):
+            self.strip_conflict_validators(serializer)
+        return serializer
+
+    def strip_conflict_validators(self, serializer):
+        """
+        Drop the unique validators of the conflict target, duplicates are updated instead.
+        """
+        conflict_fields = set(self.upsert_conflict_fields)
+        for name in conflict_fields:
+            field = serializer.fields.get(name)
+            if field is not None:
+                field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        serializer.validators = [
+            v for v in serializer.validators
+            if not (isinstance(v, UniqueTogetherValidator) and set(v.fields) == conflict_fields)
+        ]
 
     def create(self, request, *args, **kwargs):
         """
@@ -135,27 +178,107 @@ class CreateAPIView(CreateView):
             logger.warning("Request Body: {data}".format(data={**data}))
             raise NotAuthenticated(exc.detail)
 
+        created = True
         try:
-            self.perform_create(serializer)
+            if self.upsert_conflict_fields:
+                created = self.perform_upsert(serializer)
+            else:
+                self.perform_create(serializer)
         except IntegrityError as exc:
-            # search key and value from error string
-            match = re.search(pattern, exc.args[0])
-            if match:
-                key = match.group(1)
-                value = match.group(2)
+            field = integrity_error_field(exc)
+            if field:
+                key, value = field
                 logger.warning("Duplicate Data: {value}".format(value=value))
                 raise ValidationError({key: ["Already exists."]})
 
         headers = self.get_success_headers(serializer.data)
+        if not self.upsert_conflict_fields:
+            return Response(
+                serializer.data, status=status.HTTP_201_CREATED, headers=headers
+            )
+
+        data = dict(serializer.data)
+        data["detail"] = "Created." if created else "Updated."
         return Response(
-            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+            data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK, headers=headers
         )
 
+    def get_upsert_extra(self) -> dict:
+        """
+        Extra attributes written on insert only, e.g. the creator of the row.
+        """
+        return {}
+
+    def perform_upsert(self, serializer) -> bool:
+        """
+        Insert or update the row in one statement and return whether it was created.
+        """
+        model = self.get_queryset().model
+        attrs = {**serializer.validated_data, **self.get_upsert_extra()}
+        conflict_fields = list(self.upsert_conflict_fields)
+        # NULLs never conflict, the row would always be inserted
+        missing = [name for name in conflict_fields if attrs.get(name) is None]
+        if missing:
+            raise ValidationError({name: ["This field is required."] for name in missing})
+
+        update_fields = list(self.upsert_update_fields or [
+            name for name in serializer.validated_data if name not in conflict_fields
+        ])
+        # auto_now fields (e.g. `modified`) are refreshed on update, auto_now_add ones kept
+        update_fields += [
+            field.name for field in model._meta.concrete_fields
+            if getattr(field, "auto_now", False) and field.name not in update_fields
+        ]
+
+        instance, created = self.upsert_row(model, attrs, conflict_fields, update_fields)
+        serializer.instance = instance
+        # the raw INSERT sends no post_save signal
+        if is_registered(model):
+            transaction.on_commit(lambda: invalidate_instance(instance))
+        logger.info("Upserted Data: {data} ({state})".format(data=instance, state="created" if created else "updated"))
+        return created
+
+    def upsert_row(self, model, attrs: dict, conflict_fields: list, update_fields: list):
+        """
+        Run `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` (PostgreSQL) and return
+        the stored row and whether it was inserted: `xmax = 0` only holds for a
+        tuple the statement inserted, so concurrent first writes get one 201.
+        """
+        opts = model._meta
+        using = router.db_for_write(model)
+        connection = connections[using]
+        quote = connection.ops.quote_name
+
+        instance = model(**attrs)
+        fields = [
+            field for field in opts.local_concrete_fields
+            if field is not opts.auto_field and not getattr(field, "generated", False)
+        ]
+        # pre_save fills auto_now / auto_now_add timestamps
+        params = [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+
+        def column(name):
+            return quote(opts.get_field(name).column)
+
+        # an empty SET is invalid and DO NOTHING returns no row, rewrite the key instead
+        assignments = [f"{column(name)} = EXCLUDED.{column(name)}" for name in update_fields or conflict_fields[:1]]
+        sql = (
+            f"INSERT INTO {quote(opts.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({', '.join(column(name) for name in conflict_fields)}) "
+            f"DO UPDATE SET {', '.join(assignments)} "
+            f"RETURNING *, (xmax = 0) AS {quote('upsert_inserted')}"
+        )
+        row = list(model.objects.db_manager(using).raw(sql, params))[0]
+        created = row.upsert_inserted
+        del row.upsert_inserted
+        return row, created
+
     def post(self, request, *args, **kwargs):
         return self.create(request, *args, **kwargs)
 
 
-class ListAPIView(ListView):
+class ListAPIView(QuerysetOptimizerMixin, SparseFieldsetMixin, StreamingListMixin, QueryCacheMixin, ListView):
     """
     Concrete view for listing a queryset.
     """
@@ -164,7 +287,7 @@ class ListAPIView(ListView):
         return self.list(request, *args, **kwargs)
 
 
-class RetrieveAPIView(RetrieveView):
+class RetrieveAPIView(QuerysetOptimizerMixin, SparseFieldsetMixin, QueryCacheMixin, RetrieveView):
     """
     Concrete view for retrieving a model instance.
     """
@@ -173,7 +296,7 @@ class RetrieveAPIView(RetrieveView):
         return self.retrieve(request, *args, **kwargs)
 
 
-class DestroyAPIView(DestroyView):
+class DestroyAPIView(QueryCacheMixin, DestroyView):
     """
     Concrete view for deleting a model instance.
     """
@@ -192,7 +315,7 @@ class DestroyAPIView(DestroyView):
         return self.destroy(request, *args, **kwargs)
 
 
-class UpdateAPIView(UpdateView):
+class UpdateAPIView(QueryCacheMixin, UpdateView):
     """
     Concrete view for updating a model instance.
     """
@@ -219,11 +342,9 @@ class UpdateAPIView(UpdateView):
         try:
             self.perform_update(serializer)
         except IntegrityError as exc:
-            # search key and value from error string
-            match = re.search(pattern, exc.args[0])
-            if match:
-                key = match.group(1)
-                value = match.group(2)
+            field = integrity_error_field(exc)
+            if field:
+                key, value = field
                 logger.warning("Duplicate Data: {value}".format(value=value))
                 raise ValidationError({key: ["Already exists."]})
 
@@ -298,3 +419,286 @@ class RetrieveUpdateDestroyAPIView(RetrieveUpdateAPIView, DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
+
+
+class BulkMixin:
+    """
+    Shared helpers of the bulk views: payload checks, per-item error responses
+    and batch sizes.
+
+    Items are validated one by one and reported as `{"index", "errors"}` in the
+    `data.items` of the error envelope; nothing is written unless every item is
+    valid, and all writes happen in one transaction. Lookup values are converted
+    with the model field before querying, and a payload may not name the same
+    object, or the same value of a unique field, twice.
+    """
+    bulk_batch_size = 500
+    bulk_max_items = 1000
+
+    def get_bulk_items(self, request) -> list:
+        data = request.data
+        if not isinstance(data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+        if not data:
+            raise ValidationError({"non_field_errors": ["Expected a non-empty list of items."]})
+        if len(data) > self.bulk_max_items:
+            raise ValidationError(
+                {"non_field_errors": [f"Expected at most {self.bulk_max_items} items, got {len(data)}."]}
+            )
+        return data
+
+    def bulk_error_response(self, items: list, message: str = "Some items are invalid."):
+        logger.warning("Bulk Request Errors: {items}".format(items=items))
+        return Response(
+            {
+                "error": True,
+                "code": status.HTTP_400_BAD_REQUEST,
+                "message": message,
+                "data": {"items": items},
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def integrity_error_response(self, exc: IntegrityError, items: list):
+        """
+        Map a unique violation of a batch back to the first item holding the duplicate value.
+        """
+        field = integrity_error_field(exc)
+        if field is None:
+            logger.warning("Bulk Integrity Error: {exc}".format(exc=exc))
+            return self.bulk_error_response([], message="Some items conflict with existing data.")
+        key, value = field
+        logger.warning("Duplicate Data: {value}".format(value=value))
+        index = next(
+            (index for index, item in enumerate(items) if isinstance(item, dict) and str(item.get(key)) == value),
+            None,
+        )
+        return self.bulk_error_response([{"index": index, "errors": {key: ["Already exists."]}}])
+
+    def get_lookup_model_field(self):
+        opts = self.get_queryset().model._meta
+        if self.lookup_field == "pk":
+            return opts.pk
+        try:
+            return opts.get_field(self.lookup_field)
+        except FieldDoesNotExist:
+            return None
+
+    def get_bulk_lookup_values(self, items: list):
+        """
+        Return the lookup values of `items`, converted by the lookup model field,
+        and the errors of items without a valid or with a repeated one.
+        """
+        model_field = self.get_lookup_model_field()
+        values, errors, seen = [], [], set()
+        for index, item in enumerate(items):
+            value = item.get(self.lookup_field) if isinstance(item, dict) else item
+            values.append(value)
+            if value in (None, "") or isinstance(value, (dict, list)):
+                errors.append({"index": index, "errors": {self.lookup_field: ["This field is required."]}})
+                continue
+            if model_field is not None:
+                try:
+                    value = values[index] = model_field.to_python(value)
+                except DjangoValidationError as exc:
+                    errors.append({"index": index, "errors": {self.lookup_field: exc.messages}})
+                    continue
+            if str(value) in seen:
+                errors.append({"index": index, "errors": {self.lookup_field: ["Duplicate value."]}})
+            seen.add(str(value))
+        return values, errors
+
+    def get_bulk_duplicates(self, rows: list) -> list:
+        """
+        Return the errors of rows repeating the value of a unique field (or set
+        of fields) of an earlier row of the same payload.
+        """
+        opts = self.get_queryset().model._meta
+        unique_sets = [(field.name,) for field in opts.concrete_fields if field.unique]
+        unique_sets += [tuple(fields) for fields in opts.unique_together]
+        unique_sets += [tuple(constraint.fields) for constraint in opts.total_unique_constraints if constraint.fields]
+
+        errors = {}
+        for fields in unique_sets:
+            seen = set()
+            for index, attrs in enumerate(rows):
+                if not all(attrs.get(name) is not None for name in fields):
+                    # absent values fall back to defaults, NULLs never conflict
+                    continue
+                key = tuple(attrs[name] for name in fields)
+                if key not in seen:
+                    seen.add(key)
+                elif len(fields) == 1:
+                    errors.setdefault(index, {})[fields[0]] = ["Duplicate value in this request."]
+                else:
+                    errors.setdefault(index, {})["non_field_errors"] = [
+                        "The fields {fields} must make a unique set.".format(fields=", ".join(fields))
+                    ]
+        return [{"index": index, "errors": errors[index]} for index in sorted(errors)]
+
+    def get_bulk_objects(self, values: list):
+        """
+        Fetch the objects of `values` in one query, mapping missing ones to per-item errors.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.filter(**{f"{self.lookup_field}__in": values})
+        objects = {str(getattr(obj, self.lookup_field)): obj for obj in queryset}
+        errors = [
+            {"index": index, "errors": {self.lookup_field: ["Not found."]}}
+            for index, value in enumerate(values)
+            if str(value) not in objects
+        ]
+        for obj in objects.values():
+            self.check_object_permissions(self.request, obj)
+        return objects, errors
+
+
+class BulkCreateAPIView(BulkMixin, CreateView):
+    """
+    Concrete view for creating a list of model instances with `bulk_create`.
+
+    The serializer must not have many-to-many fields; extra attributes for
+    every row (e.g. the creator) come from `get_bulk_extra()`.
+    """
+
+    def get_bulk_extra(self) -> dict:
+        return {}
+
+    def create(self, request, *args, **kwargs):
+        """
+        Create model instances in batches and add some logger.
+        """
+        items = self.get_bulk_items(request)
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self.bulk_error_response(
+                [{"index": index, "errors": errors} for index, errors in enumerate(serializer.errors) if errors]
+            )
+        extra = self.get_bulk_extra()
+        errors = self.get_bulk_duplicates([{**attrs, **extra} for attrs in serializer.validated_data])
+        if errors:
+            return self.bulk_error_response(errors)
+
+        try:
+            with transaction.atomic():
+                self.perform_bulk_create(serializer)
+        except IntegrityError as exc:
+            return self.integrity_error_response(exc, items)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, serializer):
+        model = self.get_queryset().model
+        extra = self.get_bulk_extra()
+        objects = [model(**attrs, **extra) for attrs in serializer.validated_data]
+        serializer.instance = model.objects.bulk_create(objects, batch_size=self.bulk_batch_size)
+        # bulk_create sends no post_save signals
+        if is_registered(model):
+            transaction.on_commit(lambda: invalidate_model(model))
+        logger.info("Bulk Created Data: {count} {model}".format(count=len(objects), model=model.__name__))
+
+    def post(self, request, *args, **kwargs):
+        return self.create(request, *args, **kwargs)
+
+
+class BulkUpdateAPIView(BulkMixin, UpdateView):
+    """
+    Concrete view for updating a list of model instances with `bulk_update`.
+
+    Every item carries its `lookup_field` (the pk by default) next to the
+    fields to change; PATCH only validates the fields present in each item.
+    """
+
+    def update(self, request, *args, **kwargs):
+        """
+        Update model instances in batches.
+        """
+        partial = kwargs.pop("partial", False)
+        items = self.get_bulk_items(request)
+        values, errors = self.get_bulk_lookup_values(items)
+        if errors:
+            return self.bulk_error_response(errors)
+        objects, errors = self.get_bulk_objects(values)
+        if errors:
+            return self.bulk_error_response(errors)
+
+        serializers = []
+        for index, (item, value) in enumerate(zip(items, values)):
+            serializer = self.get_serializer(objects[str(value)], data=item, partial=partial)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+            serializers.append(serializer)
+        if errors:
+            return self.bulk_error_response(errors)
+
+        try:
+            with transaction.atomic():
+                instances = self.perform_bulk_update(serializers)
+        except IntegrityError as exc:
+            return self.integrity_error_response(exc, items)
+
+        data = self.get_serializer(instances, many=True).data
+        logger.info("Bulk Updated Data: {count}".format(count=len(instances)))
+        return Response(data)
+
+    def perform_bulk_update(self, serializers) -> list:
+        model = self.get_queryset().model
+        fields = set()
+        instances = []
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+            instances.append(serializer.instance)
+
+        # bulk_update skips Model.save(), so auto_now fields (e.g. `modified`) are set here
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+                fields.add(field.name)
+
+        if fields:
+            model.objects.bulk_update(instances, sorted(fields), batch_size=self.bulk_batch_size)
+            # bulk_update sends no post_save signals
+            if is_registered(model):
+                transaction.on_commit(lambda: invalidate_model(model))
+        return instances
+
+    def put(self, request, *args, **kwargs):
+        return self.update(request, *args, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        return self.partial_update(request, *args, **kwargs)
+
+
+class BulkDestroyAPIView(BulkMixin, DestroyView):
+    """
+    Concrete view for deleting a list of model instances, given as a list of
+    `lookup_field` values in the request body. Nothing is deleted when any of
+    them is not found.
+    """
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Destroy model instances and add some logger.
+        """
+        items = self.get_bulk_items(request)
+        values, errors = self.get_bulk_lookup_values(items)
+        if errors:
+            return self.bulk_error_response(errors)
+        objects, errors = self.get_bulk_objects(values)
+        if errors:
+            return self.bulk_error_response(errors)
+
+        with transaction.atomic():
+            self.perform_bulk_destroy(list(objects.values()))
+        logger.info("Bulk Deleted Data: {ids}".format(ids=list(objects)))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_bulk_destroy(self, instances):
+        # QuerySet.delete() still sends post_delete for every row
+        self.get_queryset().model.objects.filter(pk__in=[obj.pk for obj in instances]).delete()
+
+    def delete(self, request, *args, **kwargs):
+        return self.destroy(request, *args, **kwargs)
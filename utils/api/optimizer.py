@@ -0,0 +1,227 @@
+import logging
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.serializers import ListSerializer, Serializer, SerializerMethodField
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlan:
+    """
+    Relations to join or prefetch, and the columns to load, for one serializer.
+
+    `only` is None as soon as a field reads something that is not a known
+    column (method fields, properties, callables), in which case every column
+    is loaded.
+    """
+    __slots__ = ("select", "prefetch", "only")
+
+    def __init__(self):
+        self.select = set()
+        self.prefetch = set()
+        self.only = set()
+
+    def add_column(self, path: str):
+        if self.only is not None:
+            self.only.add(path)
+
+    def give_up_only(self):
+        self.only = None
+
+    def as_dict(self) -> dict:
+        return {
+            "select_related": sorted(self.select),
+            "prefetch_related": sorted(self.prefetch),
+            "only": sorted(self.only) if self.only is not None else None,
+        }
+
+
+def _join(prefix: str, name: str) -> str:
+    return f"{prefix}__{name}" if prefix else name
+
+
+def _get_field(model, name: str):
+    """
+    Model field named `name`, including reverse relations by accessor name (e.g. `book_set`).
+    """
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+        raise
+
+
+def build_plan(serializer, model) -> QueryPlan:
+    """
+    Walk the declared fields of `serializer` (nested serializers, dotted
+    sources, related fields) and plan the queryset of `model` serializing it
+    without N+1 queries.
+    """
+    plan = QueryPlan()
+    _walk(serializer, model, "", plan, prefetched=False)
+    if plan.only is not None:
+        plan.only.add(model._meta.pk.name)
+    return plan
+
+
+def _walk(serializer, model, prefix, plan, prefetched):
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, SerializerMethodField):
+            plan.give_up_only()
+            continue
+        if field.source == "*":
+            if isinstance(field, (Serializer, ListSerializer)):
+                _walk(field, model, prefix, plan, prefetched)
+            else:
+                plan.give_up_only()
+            continue
+        _walk_source(field, field.source.split("."), model, prefix, plan, prefetched)
+
+
+def _walk_source(field, parts, model, prefix, plan, prefetched):
+    # relations below a prefetch are loaded by the prefetch queries, so they are
+    # prefetched too and never restrict the columns of the main query
+    for index, part in enumerate(parts):
+        try:
+            model_field = _get_field(model, part)
+        except FieldDoesNotExist:
+            plan.give_up_only()
+            return
+
+        path = _join(prefix, part)
+        last = index == len(parts) - 1
+
+        if not model_field.is_relation:
+            if not last:
+                plan.give_up_only()
+                return
+            if not prefetched:
+                plan.add_column(path)
+            return
+
+        related_model = model_field.related_model
+        to_many = model_field.many_to_many or model_field.one_to_many
+
+        if last and not to_many and model_field.concrete and isinstance(field, PrimaryKeyRelatedField):
+            # rendered from the local `<name>_id` column, nothing to join
+            if not prefetched:
+                plan.add_column(path)
+            return
+
+        if to_many or prefetched:
+            plan.prefetch.add(path)
+            prefetched = True
+        else:
+            plan.select.add(path)
+            if model_field.concrete:
+                plan.add_column(path)
+
+        model = related_model
+        prefix = path
+
+    if isinstance(field, (Serializer, ListSerializer)):
+        _walk(field, model, prefix, plan, prefetched)
+    elif isinstance(field, ManyRelatedField):
+        if not isinstance(field.child_relation, PrimaryKeyRelatedField):
+            plan.give_up_only()
+    elif not isinstance(field, RelatedField):
+        # the related object itself is rendered (e.g. through __str__)
+        plan.give_up_only()
+
+
+def required_columns(view, queryset, extra=()) -> set:
+    """
+    Columns of `queryset` a view reads outside its serializer: the lookup field,
+    the ordering and keyset pagination fields, and `extra`. Projections such as
+    `.only()` must keep them, or every row costs a deferred-field query.
+    """
+    names = {getattr(view, "lookup_field", None), *extra}
+    for ordering in (
+        queryset.query.order_by or queryset.model._meta.ordering,
+        getattr(view, "keyset_ordering", None),
+        getattr(getattr(view, "paginator", None), "ordering", None),
+    ):
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        names.update(name.lstrip("-") for name in ordering or () if isinstance(name, str))
+
+    columns = set()
+    for name in names:
+        if not name or "__" in name:
+            continue
+        try:
+            field = queryset.model._meta.pk if name == "pk" else queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete:
+            columns.add(field.name)
+    return columns
+
+
+class QuerysetOptimizerMixin:
+    """
+    Apply `select_related`, `prefetch_related` and `only` to the view's
+    queryset from the fields its serializer actually renders.
+
+    Views opt in with `optimize_queryset = True`: columns the serializer does
+    not render are deferred, so code reading other attributes (permission
+    checks, `__str__`) must list them in `optimize_extra_columns`. The lookup
+    field and the ordering / keyset pagination fields are always loaded.
+
+    Plans are built once per serializer class (and sparse fieldset) and cached
+    on the view class. Set `optimize_debug = True` (or
+    API_QUERYSET_OPTIMIZER_DEBUG) to log the plan chosen for every request.
+    Only GET requests are optimized.
+    """
+    optimize_queryset = False
+    optimize_extra_columns = ()
+    optimize_debug = None
+
+    def get_queryset_plan(self, model) -> QueryPlan:
+        fieldset = getattr(self, "get_sparse_fieldset", lambda: None)()
+        key = (self.get_serializer_class(), repr(fieldset))
+        plans = type(self).__dict__.get("_queryset_plans")
+        if plans is None:
+            plans = {}
+            setattr(type(self), "_queryset_plans", plans)
+
+        plan = plans.get(key)
+        if plan is None:
+            if len(plans) >= 256:
+                # every sparse fieldset gets its own plan, keep the number bounded
+                plans.clear()
+            plan = plans[key] = build_plan(self.get_serializer(), model)
+        return plan
+
+    def get_required_columns(self, queryset) -> set:
+        return required_columns(self, queryset, self.optimize_extra_columns)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = getattr(self, "request", None)
+        if not self.optimize_queryset or request is None or request.method not in ("GET", "HEAD"):
+            return queryset
+
+        plan = self.get_queryset_plan(queryset.model)
+        if plan.select:
+            queryset = queryset.select_related(*sorted(plan.select))
+        if plan.prefetch:
+            queryset = queryset.prefetch_related(*sorted(plan.prefetch))
+        # a projection set by the view itself is kept as is
+        if plan.only is not None and not queryset.query.deferred_loading[0]:
+            queryset = queryset.only(*sorted(plan.only | self.get_required_columns(queryset)))
+
+        debug = self.optimize_debug
+        if debug is None:
+            debug = getattr(settings, "API_QUERYSET_OPTIMIZER_DEBUG", False)
+        if debug:
+            logger.info("Queryset plan for %s: %s", type(self).__name__, plan.as_dict())
+        return queryset
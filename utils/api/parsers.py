@@ -0,0 +1,41 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from utils.api import fastjson
+from utils.api.exceptions import PayloadTooLarge
+
+
+class FastJSONParser(JSONParser):
+    """
+    Drop-in JSONParser decoding through `utils.api.fastjson`, rejecting bodies
+    over API_MAX_JSON_BODY_SIZE bytes with a 413.
+
+    DRF reads the request stream directly, so Django's DATA_UPLOAD_MAX_MEMORY_SIZE
+    does not apply to JSON bodies.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        limit = getattr(settings, "API_MAX_JSON_BODY_SIZE", 2621440)
+
+        request = parser_context.get("request")
+        if limit and request is not None:
+            try:
+                content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                content_length = 0
+            if content_length > limit:
+                raise PayloadTooLarge()
+
+        body = stream.read(limit + 1) if limit else stream.read()
+        if limit and len(body) > limit:
+            raise PayloadTooLarge()
+
+        try:
+            if encoding.lower().replace("-", "") != "utf8":
+                body = body.decode(encoding)
+            return fastjson.loads(body)
+        except (fastjson.DecodeError, UnicodeDecodeError) as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,127 @@
+from rest_framework.renderers import JSONRenderer
+
+from utils.api import fastjson
+
+
+TOKEN_INVALID_MESSAGE = "Token is invalid or expired"
+
+
+def is_error_status(status_code: int) -> bool:
+    # 4xx/5xx bodies are turned into an error envelope, everything else is wrapped as data
+    return status_code >= 400
+
+
+def is_api_request(request) -> bool:
+    # Non-API requests (e.g., OpenAPI schema, static files, admin interface)
+    # keep their original response format
+    return request.path.replace("//", "/").startswith("/api/")
+
+
+def build_envelope(data, status_code: int, method: str, has_data: bool = True):
+    """
+    Wrap response `data` into the API envelope and return it together with the
+    status code to send.
+
+    Success responses become `{error, code, message, data}`, with `count`,
+    `next`, `previous` and `extra_data` (and `approximate` when the paginator
+    reports it) added for paginated GET responses.
+    Error responses are expected to already be in that shape (see
+    `utils.api.exception_handler`); when they carry no message, the first key
+    or item of their data is used.
+    """
+    if not is_error_status(status_code):
+        envelope = {
+            "error": False,
+            "code": status_code,
+            "message": None,
+            "data": None,
+        }
+
+        if has_data:
+            response_data = data
+            # move detail from data to the "message" key
+            if isinstance(response_data, dict) and "detail" in response_data:
+                response_data = dict(response_data)
+                envelope["message"] = response_data.pop("detail")
+
+            # For list-based views, add count, next and previous keys
+            # and set the 'data' property of the envelope to the results.
+            # Keyset pages carry a count of None.
+            results = response_data.get("results", None) if isinstance(response_data, dict) else None
+            if method == "GET" and results is not None and "count" in response_data:
+                envelope["data"] = results
+                envelope["count"] = response_data["count"]
+                if "approximate" in response_data:
+                    envelope["approximate"] = response_data["approximate"]
+                envelope["next"] = response_data.get("next", None)
+                envelope["previous"] = response_data.get("previous", None)
+                envelope["extra_data"] = response_data.get("extra_data", None)
+            else:
+                envelope["data"] = response_data
+
+            # If the 'data' property of the envelope is an empty dict,
+            # then set it to None
+            if isinstance(envelope["data"], dict) and not envelope["data"]:
+                envelope["data"] = None
+
+    elif not isinstance(data, dict) or not data.get("message", None):
+        detail = data.get("data", None) if isinstance(data, dict) else data
+        if isinstance(detail, dict):
+            message = tuple(detail)[0] if detail else detail
+        elif isinstance(detail, list):
+            message = detail[0]
+        else:
+            message = detail
+        envelope = {
+            "error": True,
+            "code": 401 if detail == TOKEN_INVALID_MESSAGE else status_code,
+            "message": message,
+            "data": detail,
+        }
+    else:
+        envelope = data
+
+    status_code = 401 if envelope["message"] == TOKEN_INVALID_MESSAGE else status_code
+    return envelope, status_code
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer encoding through `utils.api.fastjson`.
+
+    Indented output (an `indent` media type parameter) is left to the stock
+    renderer, which uses the same `LazyEncoder` semantics.
+    """
+    encoder_class = fastjson.LazyEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return fastjson.dumps(data)
+
+
+class EnvelopeJSONRenderer(FastJSONRenderer):
+    """
+    JSON renderer that wraps API responses into the envelope while rendering,
+    so the body is encoded exactly once.
+
+    Responses it rendered are flagged with `enveloped = True` and passed
+    through untouched by `utils.middleware.message_middleware.CustomResponse`.
+    Empty responses (204, or no data) keep an empty body, as with the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get("response")
+        request = renderer_context.get("request")
+        if data is None or (response is not None and response.status_code == 204):
+            return b""
+        if response is None or request is None or not is_api_request(request):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        envelope, status_code = build_envelope(data, response.status_code, request.method)
+        response.status_code = status_code
+        response.enveloped = True
+        return super().render(envelope, accepted_media_type, renderer_context)
@@ -0,0 +1,98 @@
+import logging
+from django.core.paginator import InvalidPage
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+
+from utils.api import fastjson
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingListMixin:
+    """
+    Stream `list()` responses as the standard envelope instead of building the
+    whole page in memory.
+
+    Set `stream_list = True` on the view to opt in. Rows are read with
+    `queryset.iterator(chunk_size=stream_chunk_size)` and serialized one chunk
+    at a time, so memory stays flat whatever the page size. Page number
+    pagination is applied as a queryset slice; views with any other paginator
+    keep the regular response.
+
+    The status code and headers are sent before the first row is read, so an
+    error while streaming cannot become an error response. It is logged and
+    re-raised, which makes the server abort the connection: clients see a
+    broken response instead of a well-formed but silently short list.
+    """
+    stream_list = False
+    stream_chunk_size = 500
+
+    def use_streaming(self) -> bool:
+        paginator = self.paginator
+        return self.stream_list and (paginator is None or isinstance(paginator, PageNumberPagination))
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_streaming():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset, meta = self.paginate_stream(queryset)
+        return StreamingHttpResponse(self.stream_envelope(queryset, meta), content_type="application/json")
+
+    def paginate_stream(self, queryset):
+        """
+        Return the queryset slice of the requested page and its pagination keys,
+        without evaluating the page.
+        """
+        paginator = self.paginator
+        page_size = paginator.get_page_size(self.request) if paginator is not None else None
+        if not page_size:
+            return queryset, None
+
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        page_number = paginator.get_page_number(self.request, django_paginator)
+        try:
+            paginator.page = django_paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = paginator.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        paginator.request = self.request
+
+        meta = {"count": django_paginator.count}
+        if hasattr(django_paginator, "approximate"):
+            meta["approximate"] = django_paginator.approximate
+        meta.update(next=paginator.get_next_link(), previous=paginator.get_previous_link(), extra_data=None)
+        return paginator.page.object_list, meta
+
+    def iter_chunks(self, queryset):
+        chunk = []
+        for row in queryset.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(row)
+            if len(chunk) >= self.stream_chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def stream_envelope(self, queryset, meta=None):
+        # same keys, in the same order, as utils.api.renderers.build_envelope
+        head = fastjson.dumps({"error": False, "code": 200, "message": None})
+        yield head[:-1] + b',"data":['
+
+        try:
+            first = True
+            for chunk in self.iter_chunks(queryset):
+                rows = fastjson.dumps(self.get_serializer(chunk, many=True).data)
+                if len(rows) <= 2:
+                    continue
+                yield rows[1:-1] if first else b"," + rows[1:-1]
+                first = False
+        except Exception:
+            logger.exception("Streaming list response of %s failed.", type(self).__name__)
+            raise
+
+        tail = b"]"
+        if meta is not None:
+            tail += b"," + fastjson.dumps(meta)[1:-1]
+        yield tail + b"}"
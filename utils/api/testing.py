@@ -0,0 +1,22 @@
+import contextlib
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextlib.contextmanager
+def assert_max_queries(max_queries: int, using: str = DEFAULT_DB_ALIAS):
+    """
+    Fail when the wrapped block runs more than `max_queries` queries, listing them.
+
+        with assert_max_queries(3):
+            client.get("/api/v1/users/")
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    executed = len(context.captured_queries)
+    if executed > max_queries:
+        queries = "\n".join(
+            f"{index}. {query['sql']}" for index, query in enumerate(context.captured_queries, start=1)
+        )
+        raise AssertionError(f"{executed} queries executed, {max_queries} allowed:\n{queries}")
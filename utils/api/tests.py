@@ -0,0 +1,242 @@
+import datetime
+import decimal
+import unittest
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.base.base_views import KeysetPagination
+from utils.api import fastjson, generics
+
+USER = get_user_model()
+
+VALUES = {
+    "set": {1, 2},
+    "frozenset": frozenset(["a"]),
+    "generator": (index for index in range(3)),
+    "bytes": b"raw",
+    "decimal": decimal.Decimal("1250.50"),
+    "datetime": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+    "date": datetime.date(2024, 1, 2),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "lazy": _("Member"),
+    "nested": {1: [{"tuple": (1, "two")}]},
+}
+
+EXPECTED = (
+    b'{"set":[1,2],"frozenset":["a"],"generator":[0,1,2],"bytes":"raw","decimal":"1250.50",'
+    b'"datetime":"2024-01-02T03:04:05.678Z","date":"2024-01-02",'
+    b'"uuid":"12345678-1234-5678-1234-567812345678","lazy":"Member",'
+    b'"nested":{"1":[{"tuple":[1,"two"]}]}}'
+)
+
+
+def values():
+    # generators are consumed by the first encoding
+    return dict(VALUES, generator=(index for index in range(3)))
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_stdlib_backend_uses_default(self):
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumps(values()), EXPECTED)
+
+    def test_stdlib_backend_rejects_unknown_objects(self):
+        with mock.patch.object(fastjson, "orjson", None):
+            with self.assertRaises(TypeError):
+                fastjson.dumps({"object": object()})
+
+    @unittest.skipIf(fastjson.orjson is None, "orjson is not installed")
+    def test_backends_agree(self):
+        self.assertEqual(fastjson.dumps(values()), EXPECTED)
+
+    def test_line_separators_are_escaped(self):
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumps(["a\u2028b"]), b'["a\\u2028b"]')
+
+
+class FailingUsernameSerializer(serializers.ModelSerializer):
+    username = serializers.SerializerMethodField()
+
+    class Meta:
+        model = USER
+        fields = ["id", "username"]
+
+    def get_username(self, user):
+        if user.username == "broken":
+            raise ValueError("cannot render")
+        return user.username
+
+
+class StreamingUserList(generics.ListAPIView):
+    queryset = USER.objects.order_by("id")
+    serializer_class = FailingUsernameSerializer
+    pagination_class = None
+    authentication_classes = []
+    permission_classes = []
+    stream_list = True
+    stream_chunk_size = 1
+
+
+# signal handlers only need some cache
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class StreamingListTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def get(self):
+        return StreamingUserList.as_view()(self.factory.get("/users/"))
+
+    def test_streams_the_envelope(self):
+        USER.objects.create(username="first")
+        response = self.get()
+
+        body = fastjson.loads(b"".join(response.streaming_content))
+        self.assertEqual(body["data"], [{"id": body["data"][0]["id"], "username": "first"}])
+        self.assertIs(body["error"], False)
+
+    def test_failure_aborts_the_stream(self):
+        USER.objects.create(username="first")
+        USER.objects.create(username="broken")
+        response = self.get()
+
+        received = []
+        with self.assertLogs("utils.api.streaming", "ERROR"):
+            with self.assertRaises(ValueError):
+                for part in response.streaming_content:
+                    received.append(part)
+        # the rows sent so far, never the closing tail
+        self.assertFalse(b"".join(received).endswith(b"]}"))
+
+
+class UserRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = USER
+        fields = ["id", "username", "email"]
+
+
+class OpenUserViewMixin:
+    queryset = USER.objects.all()
+    serializer_class = UserRowSerializer
+    authentication_classes = []
+    permission_classes = []
+
+
+class BulkCreateUsers(OpenUserViewMixin, generics.BulkCreateAPIView):
+    pass
+
+
+class BulkUpdateUsers(OpenUserViewMixin, generics.BulkUpdateAPIView):
+    pass
+
+
+# signal handlers only need some cache
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class BulkViewTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = USER.objects.create(username="existing")
+
+    def create(self, items):
+        return BulkCreateUsers.as_view()(self.factory.post("/users/bulk/", items, format="json"))
+
+    def patch(self, items):
+        return BulkUpdateUsers.as_view()(self.factory.patch("/users/bulk/", items, format="json"))
+
+    def test_bulk_create(self):
+        response = self.create([{"username": "one"}, {"username": "two"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(USER.objects.filter(username__in=["one", "two"]).count(), 2)
+
+    def test_duplicate_unique_values_in_the_payload_are_item_errors(self):
+        response = self.create([{"username": "one"}, {"username": "two"}, {"username": "one"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["data"]["items"],
+            [{"index": 2, "errors": {"username": ["Duplicate value in this request."]}}],
+        )
+        self.assertFalse(USER.objects.filter(username="one").exists())
+
+    def test_unparsed_integrity_error_is_a_400(self):
+        with mock.patch.object(
+            generics.BulkCreateAPIView, "perform_bulk_create", side_effect=generics.IntegrityError("constraint failed")
+        ):
+            response = self.create([{"username": "one"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIs(response.data["error"], True)
+
+    def test_bulk_update(self):
+        response = self.patch([{"pk": str(self.user.pk), "email": "new@example.com"}])
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "new@example.com")
+
+    def test_malformed_lookup_values_are_item_errors(self):
+        response = self.patch([{"pk": self.user.pk, "email": "new@example.com"}, {"pk": "abc"}])
+        self.assertEqual(response.status_code, 400)
+        items = response.data["data"]["items"]
+        self.assertEqual([item["index"] for item in items], [1])
+        self.assertIn("pk", items[0]["errors"])
+
+    def test_repeated_lookup_values_are_item_errors(self):
+        response = self.patch([{"pk": self.user.pk}, {"pk": str(self.user.pk)}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["data"]["items"], [{"index": 1, "errors": {"pk": ["Duplicate value."]}}])
+
+    def test_unregistered_models_schedule_no_cache_invalidation(self):
+        with mock.patch.object(generics, "invalidate_model") as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create([{"username": "one"}])
+                self.patch([{"pk": self.user.pk, "email": "new@example.com"}])
+        invalidate.assert_not_called()
+
+    def test_registered_models_are_invalidated_after_bulk_writes(self):
+        with mock.patch.object(generics, "is_registered", return_value=True):
+            with mock.patch.object(generics, "invalidate_model") as invalidate:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.create([{"username": "one"}])
+        invalidate.assert_called_once_with(USER)
+
+
+class SparseKeysetUserList(OpenUserViewMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-date_joined", "-id")
+    sparse_fields = "__all__"
+
+
+# signal handlers only need some cache
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            USER.objects.create(username=f"user{index}", email=f"user{index}@example.com")
+
+    def get(self, url):
+        return SparseKeysetUserList.as_view()(APIRequestFactory().get(url))
+
+    def test_projection_keeps_the_keyset_columns(self):
+        with self.assertNumQueries(1):
+            response = self.get("/users/?fields=username&page_size=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [{"username": "user2"}, {"username": "user1"}])
+
+        with self.assertNumQueries(1):
+            response = self.get(response.data["next"])
+        self.assertEqual(response.data["results"], [{"username": "user0"}])
+
+    def test_projection_keeps_the_lookup_field(self):
+        view = SparseKeysetUserList()
+        view.lookup_field = "email"
+        view.request = Request(APIRequestFactory().get("/users/?fields=username"))
+        view.format_kwarg = None
+        # (names, defer) where defer False means only() these names
+        names, defer = view.get_queryset().query.deferred_loading
+        self.assertFalse(defer)
+        self.assertEqual(set(names), {"date_joined", "email", "id", "username"})
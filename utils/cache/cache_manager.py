@@ -1,33 +1,335 @@
 # utils/cache_manager.py
-# TODO: CacheManager is defined but never used in the codebase - remove if not needed
+import logging
+import time
+import uuid
+import redis
+from collections import defaultdict
+from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Model
-import hashlib
-import json
+
+from utils.cache.clients import blocking_client
+from utils.cache.lru import LRUCache
+from utils.threads import ProcessThread, run_with_backoff
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide first tier shared by every CacheManager, keyed by the full cache key.
+local_cache = LRUCache(
+    maxsize=getattr(settings, "CACHE_MANAGER_LOCAL_MAXSIZE", 10000),
+    ttl=getattr(settings, "CACHE_MANAGER_LOCAL_TTL", 30.0),
+)
+
+# Per-worker copy of the namespace generation of each prefix, keyed by its Redis key.
+generation_cache = LRUCache(
+    maxsize=1024,
+    ttl=getattr(settings, "CACHE_MANAGER_GENERATION_TTL", 5.0),
+)
+GENERATION_KEY = "cache:gen:{prefix}"
+
+
+class PrefixStats:
+    """
+    Hit/miss counters and Redis latency for one cache prefix.
+    """
+    __slots__ = ("local_hits", "remote_hits", "misses", "writes", "remote_calls", "remote_seconds")
+
+    def __init__(self):
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.remote_calls = 0
+        self.remote_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": (self.local_hits + self.remote_hits) / lookups if lookups else 0.0,
+            "local_hit_rate": self.local_hits / lookups if lookups else 0.0,
+            "remote_avg_ms": self.remote_seconds * 1000 / self.remote_calls if self.remote_calls else 0.0,
+        }
+
+
+class InvalidationBus:
+    """
+    Keeps the first tier of every worker coherent over Redis pub/sub.
+
+    Writes and deletes publish the affected keys prefixed with the sender's
+    origin id; a listener thread in each other worker drops them from
+    `local_cache`. When the subscription is lost the
+    whole first tier is cleared, since invalidations may have been missed in
+    the meantime, and the listener reconnects with backoff. An idle
+    subscription is PINGed every `ping_interval` seconds and treated as lost
+    when nothing, not even the PONG, arrived for `stale_after` seconds.
+    """
+    channel = "cache:invalidate"
+    ping_interval = 10.0
+    stale_after = 30.0
+
+    def __init__(self, enabled: bool = True, backend=None):
+        self.enabled = enabled
+        self.cache = backend or cache
+        self.origin = None
+        self._listener = ProcessThread("cache-invalidation-listener", self._run, on_start=self._new_origin)
+
+    def get_client(self):
+        return self.cache.client.get_client(write=True)
+
+    def publish(self, keys):
+        if not self.enabled or not keys:
+            return
+        try:
+            self.get_client().publish(self.channel, "\n".join([self.origin or "", *keys]))
+        except Exception:
+            logger.exception("Failed to publish cache invalidation for %s keys.", len(keys))
+
+    def ensure_started(self):
+        if self.enabled:
+            self._listener.ensure_started()
+
+    def _new_origin(self):
+        self.origin = uuid.uuid4().hex
+
+    def _run(self):
+        run_with_backoff(self._session, self._lost)
+
+    def _session(self, connected):
+        pubsub = blocking_client(self.cache, self.ping_interval + 5).pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel)
+            # anything cached before the subscription may already be stale
+            local_cache.clear()
+            connected()
+            last_seen = last_ping = time.monotonic()
+            while True:
+                message = pubsub.get_message(timeout=self.ping_interval)
+                now = time.monotonic()
+                if message is not None:
+                    last_seen = now
+                    if message["type"] == "message":
+                        self.handle(message.get("data"))
+                elif now - last_seen > self.stale_after:
+                    raise redis.TimeoutError("No PONG on the cache invalidation channel.")
+                if now - last_ping >= self.ping_interval:
+                    pubsub.ping()
+                    last_ping = now
+        finally:
+            pubsub.close()
+
+    def _lost(self):
+        logger.exception("Cache invalidation channel lost, clearing the local cache.")
+        local_cache.clear()
+
+    def handle(self, data):
+        if isinstance(data, bytes):
+            data = data.decode()
+        if not data:
+            return
+        origin, *keys = data.split("\n")
+        if origin == self.origin:
+            return
+        for key in keys:
+            if key.startswith("cache:gen:"):
+                generation_cache.pop(key)
+            else:
+                local_cache.pop(key)
+
+
+invalidation_bus = InvalidationBus(enabled=getattr(settings, "CACHE_MANAGER_INVALIDATION", True))
 
 
 class CacheManager:
-    def __init__(self, models: Model):
-        self.prefix = models.__class__.__name__.lower()
+    """
+    Two-tier cache for a single key prefix.
+
+    Reads go to a bounded per-process LRU (`local_cache`) first and to Redis
+    second; Redis hits are copied into the local tier for `local_ttl` seconds.
+    Writes go to Redis, refresh the local copy and are broadcast through
+    `invalidation_bus` so other workers drop their copy.
+
+    Keys are namespaced with a generation counter kept in Redis
+    (`cache:gen:{prefix}`) and cached per worker for a few seconds, so
+    `clear_prefix` is a single INCR whatever the number of keys: entries of
+    older generations are never read again and are left to expire by TTL.
+
+    Values served from the local tier are shared between requests of the same
+    worker and must be treated as read-only.
 
-    def _make_key(self, key: str) -> str:
+    `models` may be a model class, a model instance or a plain string prefix.
+    """
+
+    _stats = defaultdict(PrefixStats)
+
+    def __init__(self, models, local_ttl: float = None, use_local: bool = True):
+        self.prefix = self.get_prefix(models)
+        self.local_ttl = local_ttl
+        self.use_local = use_local and local_cache.maxsize > 0
+        if self.use_local:
+            invalidation_bus.ensure_started()
+
+    @staticmethod
+    def get_prefix(models) -> str:
+        if isinstance(models, str):
+            return models
+        if isinstance(models, type) and issubclass(models, Model):
+            return models.__name__.lower()
+        return models.__class__.__name__.lower()
+
+    @property
+    def stats(self) -> PrefixStats:
+        return self._stats[self.prefix]
+
+    @classmethod
+    def all_stats(cls) -> dict:
+        return {prefix: stats.as_dict() for prefix, stats in cls._stats.items()}
+
+    @property
+    def generation_key(self) -> str:
+        return GENERATION_KEY.format(prefix=self.prefix)
+
+    def get_generation(self) -> int:
+        generation = generation_cache.get(self.generation_key)
+        if generation is None:
+            generation = self._remote(cache.get, self.generation_key)
+            if generation is None:
+                # first use of the prefix, whoever adds it first wins
+                cache.add(self.generation_key, 1, None)
+                generation = cache.get(self.generation_key) or 1
+            generation_cache.set(self.generation_key, generation)
+        return generation
+
+    def _make_key(self, key: str, generation: int = None) -> str:
         """
-        Create a unique cache key using prefix and given key
+        Create a unique cache key using prefix, namespace generation and given key
         """
-        return f"{self.prefix}:{key}"
+        if generation is None:
+            generation = self.get_generation()
+        return f"{self.prefix}:v{generation}:{key}"
+
+    def _local_ttl(self, timeout):
+        ttl = self.local_ttl if self.local_ttl is not None else local_cache.ttl
+        return ttl if timeout is None else min(ttl, timeout)
+
+    def _remote(self, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.stats.remote_calls += 1
+            self.stats.remote_seconds += time.perf_counter() - started
 
-    def get(self, key: str):
+    def get(self, key: str, default=None):
         full_key = self._make_key(key)
-        return cache.get(full_key)
+        if self.use_local:
+            value = local_cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                self.stats.local_hits += 1
+                return value
+
+        value = self._remote(cache.get, full_key, _MISSING)
+        if value is _MISSING:
+            self.stats.misses += 1
+            return default
+
+        self.stats.remote_hits += 1
+        if self.use_local:
+            local_cache.set(full_key, value, ttl=self._local_ttl(None))
+        return value
+
+    def get_many(self, keys) -> dict:
+        """
+        Return a dict of the found keys, fetching everything missing locally in one round trip.
+        """
+        found = {}
+        remote_keys = {}
+        generation = self.get_generation()
+        for key in keys:
+            full_key = self._make_key(key, generation)
+            value = local_cache.get(full_key, _MISSING) if self.use_local else _MISSING
+            if value is _MISSING:
+                remote_keys[full_key] = key
+            else:
+                found[key] = value
+        self.stats.local_hits += len(found)
+
+        if remote_keys:
+            values = self._remote(cache.get_many, list(remote_keys))
+            for full_key, value in values.items():
+                found[remote_keys[full_key]] = value
+                if self.use_local:
+                    local_cache.set(full_key, value, ttl=self._local_ttl(None))
+            self.stats.remote_hits += len(values)
+            self.stats.misses += len(remote_keys) - len(values)
+        return found
 
     def set(self, key: str, value, timeout: int = 60):
         full_key = self._make_key(key)
-        cache.set(full_key, value, timeout)
+        self._remote(cache.set, full_key, value, timeout)
+        self.stats.writes += 1
+        if self.use_local:
+            local_cache.set(full_key, value, ttl=self._local_ttl(timeout))
+            invalidation_bus.publish([full_key])
+
+    def add(self, key: str, value, timeout: int = 60) -> bool:
+        """
+        Set the key only if it does not exist yet, return whether it was set.
+        """
+        full_key = self._make_key(key)
+        added = self._remote(cache.add, full_key, value, timeout)
+        if added:
+            self.stats.writes += 1
+            if self.use_local:
+                local_cache.set(full_key, value, ttl=self._local_ttl(timeout))
+                invalidation_bus.publish([full_key])
+        return added
+
+    def set_many(self, data: dict, timeout: int = 60):
+        generation = self.get_generation()
+        full_data = {self._make_key(key, generation): value for key, value in data.items()}
+        self._remote(cache.set_many, full_data, timeout)
+        self.stats.writes += len(full_data)
+        if self.use_local:
+            for full_key, value in full_data.items():
+                local_cache.set(full_key, value, ttl=self._local_ttl(timeout))
+            invalidation_bus.publish(list(full_data))
 
     def delete(self, key: str):
         full_key = self._make_key(key)
-        cache.delete(full_key)
+        self._remote(cache.delete, full_key)
+        if self.use_local:
+            local_cache.pop(full_key)
+            invalidation_bus.publish([full_key])
+
+    def delete_many(self, keys):
+        generation = self.get_generation()
+        full_keys = [self._make_key(key, generation) for key in keys]
+        self._remote(cache.delete_many, full_keys)
+        if self.use_local:
+            for full_key in full_keys:
+                local_cache.pop(full_key)
+            invalidation_bus.publish(full_keys)
+
+    def clear_prefix(self) -> int:
+        """
+        Invalidate every key of the prefix by moving it to a new generation.
+        """
+        try:
+            generation = self._remote(cache.incr, self.generation_key)
+        except ValueError:
+            # no generation yet, nothing can have been cached under the prefix
+            if cache.add(self.generation_key, 2, None):
+                generation = 2
+            else:
+                generation = cache.incr(self.generation_key)
+        generation_cache.set(self.generation_key, generation)
+        invalidation_bus.publish([self.generation_key])
+        return generation
+
 
-    def clear_prefix(self):
-        # Optional: implement this if you're using a backend like Redis that supports key scanning
-        pass
+_MISSING = object()
@@ -0,0 +1,30 @@
+import redis
+
+# seconds between PINGs on an idle background connection
+HEALTH_CHECK_INTERVAL = 15
+
+
+def blocking_client(backend, read_timeout: float):
+    """
+    Redis client with the connection settings of a django-redis `backend` and a
+    socket read timeout of `read_timeout` seconds.
+
+    Background listeners (XREAD BLOCK, pub/sub) wait on the socket for longer
+    than the SOCKET_TIMEOUT tuned for request-path calls, so they get their own
+    small pool instead of the cache's client. The timeout must stay a little
+    above the longest wait of the listener: a half-open connection then fails
+    with `redis.TimeoutError` instead of blocking forever. TCP keepalive and
+    periodic PINGs catch connections dropped while idle.
+    """
+    pool = backend.client.get_client(write=True).connection_pool
+    kwargs = dict(
+        pool.connection_kwargs,
+        socket_timeout=read_timeout,
+        socket_keepalive=True,
+        health_check_interval=HEALTH_CHECK_INTERVAL,
+    )
+    return redis.Redis(
+        connection_pool=redis.ConnectionPool(
+            connection_class=pool.connection_class, max_connections=2, **kwargs
+        )
+    )
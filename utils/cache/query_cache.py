@@ -0,0 +1,245 @@
+"""
+Read-through cache of `get_object()` instances and list responses for the
+generic views in `utils.api.generics`.
+
+Views opt in with `cache_queryset = True`. Entries are keyed by model, pk and
+a hash of the view's filtered queryset SQL (which carries any per-user
+scoping), and are invalidated on commit by the `post_save`, `post_delete` and
+`m2m_changed` signals of the cached models:
+    - a saved row is replaced by a tombstone holding its `modified` timestamp,
+      so a request that read the row before the write cannot cache the older
+      version afterwards (models without `modified` are simply deleted),
+    - any change bumps the list namespace of the model.
+
+Writes that bypass signals (`QuerySet.update()`, `bulk_create`, `bulk_update`,
+raw SQL) must call `invalidate_model()`. Like `invalidate_instance()`, it does
+nothing for models that are not cached (see `is_registered`). Models whose
+views scope through related tables list them in `cache_depends_on` so changes
+there clear the model's whole namespace.
+"""
+import hashlib
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.response import Response
+
+from utils.cache.cache_manager import CacheManager
+
+QUERY_CACHE_TTL = getattr(settings, "QUERY_CACHE_TTL", 60)
+
+# model -> models whose namespace is cleared when it changes
+_registry = {}
+
+
+def register(model, depends_on=()):
+    """
+    Enable signal-driven invalidation for `model` and, through `depends_on`,
+    clear its whole namespace when one of those models changes.
+    """
+    _registry.setdefault(model, set())
+    for dependency in depends_on:
+        if isinstance(dependency, str):
+            dependency = apps.get_model(dependency)
+        _registry.setdefault(dependency, set()).add(model)
+
+
+def is_registered(model) -> bool:
+    return model in _registry or model._meta.label in getattr(settings, "QUERY_CACHE_MODELS", ())
+
+
+def detail_cache(model) -> CacheManager:
+    # instances are handed to views that mutate them, so never share them in process memory
+    return CacheManager(model, use_local=False)
+
+
+def list_cache(model) -> CacheManager:
+    return CacheManager(f"{CacheManager.get_prefix(model)}:list")
+
+
+def query_hash(queryset):
+    """
+    Canonical hash of the SQL a queryset runs, None when it cannot be compiled.
+
+    The SQL and its parameters are hashed separately (`str(query)` pastes the
+    parameters in unquoted, so different filters could render the same string),
+    together with the database alias.
+    """
+    try:
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    return hashlib.sha1(f"{queryset.db}\n{sql}\n{params!r}".encode()).hexdigest()
+
+
+def _modified(instance):
+    return getattr(instance, "modified", None)
+
+
+def remember(instance, scope: str, timeout: int = None):
+    """
+    Cache `instance` as found within the queryset hashed as `scope`, unless a
+    newer version or a deletion was recorded for it in the meantime.
+    """
+    manager = detail_cache(type(instance))
+    key = f"pk:{instance.pk}"
+    timeout = QUERY_CACHE_TTL if timeout is None else timeout
+    modified = _modified(instance)
+
+    entry = manager.get(key)
+    if entry is None:
+        manager.add(key, {"instance": instance, "modified": modified, "scopes": {scope}}, timeout)
+        return
+    if entry.get("deleted"):
+        return
+    if entry["modified"] is not None and (modified is None or modified < entry["modified"]):
+        return
+
+    scopes = {scope}
+    if entry["instance"] is not None and entry["modified"] == modified:
+        scopes |= entry["scopes"]
+    manager.set(key, {"instance": instance, "modified": modified, "scopes": scopes}, timeout)
+
+
+def recall(model, pk, scope: str):
+    entry = detail_cache(model).get(f"pk:{pk}")
+    if entry is None or entry.get("instance") is None or scope not in entry["scopes"]:
+        return None
+    return entry["instance"]
+
+
+def invalidate_instance(instance, deleted: bool = False):
+    model = type(instance)
+    if not is_registered(model):
+        return
+    manager = detail_cache(model)
+    key = f"pk:{instance.pk}"
+    modified = _modified(instance)
+    if deleted:
+        manager.set(key, {"instance": None, "modified": None, "scopes": set(), "deleted": True}, QUERY_CACHE_TTL)
+    elif modified is not None:
+        manager.set(key, {"instance": None, "modified": modified, "scopes": set()}, QUERY_CACHE_TTL)
+    else:
+        manager.delete(key)
+    invalidate_lists(model)
+
+
+def invalidate_lists(model):
+    list_cache(model).clear_prefix()
+    for dependent in _registry.get(model, ()):
+        invalidate_model(dependent)
+
+
+def invalidate_model(model):
+    """
+    Drop every cached instance and list of `model`, for writes that bypass signals.
+    """
+    if not is_registered(model):
+        return
+    detail_cache(model).clear_prefix()
+    list_cache(model).clear_prefix()
+
+
+def _on_commit(func, using=None):
+    transaction.on_commit(func, using=using)
+
+
+def _post_save(sender, instance, using=None, **kwargs):
+    if is_registered(sender):
+        _on_commit(lambda: invalidate_instance(instance), using)
+
+
+def _post_delete(sender, instance, using=None, **kwargs):
+    if is_registered(sender):
+        _on_commit(lambda: invalidate_instance(instance, deleted=True), using)
+
+
+def _m2m_changed(sender, instance, action, model, pk_set, using=None, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if is_registered(type(instance)):
+        _on_commit(lambda: invalidate_model(type(instance)), using)
+    if is_registered(model):
+        _on_commit(lambda: invalidate_model(model), using)
+
+
+post_save.connect(_post_save, dispatch_uid="query_cache_post_save")
+post_delete.connect(_post_delete, dispatch_uid="query_cache_post_delete")
+m2m_changed.connect(_m2m_changed, dispatch_uid="query_cache_m2m_changed")
+
+
+class QueryCacheMixin:
+    """
+    Serve `get_object()` and `list()` of GET requests from the query cache.
+
+    Set `cache_queryset = True` on the view to opt in, `cache_timeout` to
+    override QUERY_CACHE_TTL and `cache_depends_on` to the models (or
+    "app.Model" labels) `get_queryset()` filters through.
+    """
+    cache_queryset = False
+    cache_timeout = None
+    cache_depends_on = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        queryset = getattr(cls, "queryset", None)
+        if cls.cache_queryset and queryset is not None:
+            register(queryset.model, cls.cache_depends_on)
+
+    def use_query_cache(self) -> bool:
+        return self.cache_queryset and self.request.method in ("GET", "HEAD")
+
+    def get_object(self):
+        if not self.use_query_cache():
+            return super().get_object()
+
+        queryset = self.filter_queryset(self.get_queryset())
+        register(queryset.model, self.cache_depends_on)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        scope = query_hash(queryset)
+        if scope is None or self.lookup_field not in ("pk", queryset.model._meta.pk.name):
+            return super().get_object()
+
+        instance = recall(queryset.model, self.kwargs[lookup_url_kwarg], scope)
+        if instance is None:
+            instance = super().get_object()
+            remember(instance, scope, self.cache_timeout)
+            return instance
+
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    def list_cache_key(self, queryset):
+        scope = query_hash(queryset)
+        if scope is None:
+            return None
+        params = sorted(
+            (key, sorted(self.request.query_params.getlist(key))) for key in self.request.query_params
+        )
+        raw = f"{type(self).__module__}.{type(self).__qualname__}|{scope}|{params}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_query_cache():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        register(queryset.model, self.cache_depends_on)
+        key = self.list_cache_key(queryset)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        manager = list_cache(queryset.model)
+        data = manager.get(key)
+        if data is not None:
+            # hand out a copy so the cached page is never modified in place
+            return Response(dict(data) if isinstance(data, dict) else list(data))
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = QUERY_CACHE_TTL if self.cache_timeout is None else self.cache_timeout
+            data = dict(response.data) if isinstance(response.data, dict) else list(response.data)
+            manager.set(key, data, timeout)
+            response.data = dict(data) if isinstance(data, dict) else list(data)
+        return response
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+
+class ProcessThread:
+    """
+    Daemon thread running `target`, started at most once per process.
+
+    Threads do not survive a fork, so a pre-forked worker starts its own on its
+    first `ensure_started()` call. `on_start`, when given, runs under the start
+    lock right before the thread is created, to reset per-process state.
+    """
+
+    def __init__(self, name: str, target, on_start=None):
+        self.name = name
+        self.target = target
+        self.on_start = on_start
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure_started(self) -> bool:
+        """
+        Start the thread in this process unless it already runs, return True when started.
+        """
+        if self.is_running():
+            return False
+
+        with self._lock:
+            if self.is_running():
+                return False
+            self._pid = os.getpid()
+            if self.on_start is not None:
+                self.on_start()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+        return True
+
+
+def run_with_backoff(session, on_error, initial: float = 1.0, maximum: float = 30.0):
+    """
+    Run `session(connected)` forever, restarting it after an exception.
+
+    `on_error` is called from the `except` block (so `logger.exception` works)
+    and the restart waits with exponential backoff, up to `maximum` seconds.
+    `session` calls `connected()` once it is up again, which resets the backoff.
+    """
+    backoff = initial
+
+    def connected():
+        nonlocal backoff
+        backoff = initial
+
+    while True:
+        try:
+            session(connected)
+        except Exception:
+            on_error()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, maximum)